@@ -1,20 +1,99 @@
 from bot.dbot import DBot
-from observer.observer_client import observer, Event, logger, nsroute
+from bot.chat_relay import ChatRelay
+from observer.observer_client import observer, Event, Param, logger, nsroute, metrics
 
 import discord
+from cachetools import TTLCache
+
+from typing import Dict, List, Optional
 
 import config
 
 dbot: DBot = DBot(config.BOT_TOKEN)
 
-cs_chat_duser_msg: bool = False
+# Состояние чата - по id канала (несколько серверов могут писать в один канал)
+cs_chat_duser_msg: Dict[int, bool] = {}
 cs_chat_max_chars: int = 1000
-cs_chat_last_message: discord.Message = None
+cs_chat_last_message: Dict[int, discord.Message] = {}
+cs_chat_relays: Dict[int, ChatRelay] = {}
+
+# Лимит Discord на длину сообщения и обертка ```ansi\n...``` вокруг текста чата
+discord_max_chars: int = 2000
+ansi_wrapper_chars: int = len("```ansi\n```")
+
+# Сообщение статуса - у каждого сервера свое
+cs_status_message: Dict[str, discord.Message] = {}
+
+# Участники сервера, не найденные в кэше шлюза (None - не участник), по discord_id
+member_cache: TTLCache = TTLCache(maxsize=config.MEMBER_CACHE_SIZE, ttl=config.MEMBER_CACHE_TTL)
+
+# Ключи якорей (id сообщений в Redis), для которых Redis уже ответил после запуска
+anchors_checked: set = set()
+
+# Якоря, которые не удалось записать (Redis недоступен): ключ -> id сообщения, пишутся повторно
+anchors_unsaved: Dict[str, int] = {}
 
-cs_status_message: discord.Message = None
+# Задержка websocket-соединения с Discord (heartbeat), до подключения - NaN
+metrics.register_gauge("dbot_discord_latency_seconds", "Задержка соединения с Discord",
+                       lambda: dbot.bot.latency)
+metrics.register_gauge("dbot_discord_chat_lines_per_flush", "Среднее число строк чата CS в одной публикации",
+                       lambda: {str(channel_id): relay.stats()["merged_avg"] for channel_id, relay in cs_chat_relays.items()},
+                       label="channel")
 
 # SECTION Utilities
 
+# -- server_settings
+def server_settings(server_id: Optional[str]) -> Optional[dict]:
+  """Настройки сервера из config.CS_SERVERS, пустой server_id - первый сервер"""
+  if not server_id:
+    server_id = next(iter(config.CS_SERVERS))
+
+  return config.CS_SERVERS.get(server_id)
+
+# -- anchor_key
+def anchor_key(kind: str, channel_id: int, server_id: Optional[str] = None) -> str:
+  """Ключ якоря в Redis: chat:<канал> или status:<канал>:<сервер>"""
+  return f"{kind}:{channel_id}" if server_id is None else f"{kind}:{channel_id}:{server_id}"
+
+# -- save_anchor
+async def save_anchor(key: str, message_id: int) -> None:
+  """Запоминает id сообщения в Redis. Если Redis не ответил, запись повторит save_unsaved_anchors"""
+  if await nsroute.call_route("/redis/set_message_anchor", key, message_id):
+    anchors_checked.add(key)
+    anchors_unsaved.pop(key, None)
+  else:
+    anchors_unsaved[key] = message_id
+
+# -- save_unsaved_anchors
+async def save_unsaved_anchors() -> None:
+  for key, message_id in list(anchors_unsaved.items()):
+    await save_anchor(key, message_id)
+
+# -- reattach_message
+async def reattach_message(key: str, channel: discord.TextChannel, must_be_last: bool = False) -> Optional[discord.Message]:
+  """
+  Находит сообщение, которое бот правил до перезапуска (один раз на ключ).
+  Redis подключается позже бота (BE_READY), поэтому вызывается при первом использовании.
+  must_be_last - сообщение годится, только если после него в канал никто не писал (чат)
+  """
+  if key in anchors_checked:
+    return None
+
+  # None - Redis не ответил (еще не подключен или недоступен), спросим при следующем использовании
+  message_id = await nsroute.call_route("/redis/get_message_anchor", key)
+  if message_id is None:
+    return None
+  anchors_checked.add(key)
+
+  if not message_id or (must_be_last and channel.last_message_id != message_id):
+    return None
+
+  try:
+    with metrics.measure("discord.fetch_message"):
+      return await channel.fetch_message(message_id)
+  except discord.HTTPException:
+    return None
+
 # -- concat_message
 def concat_message(old_message: str, new_message: str) -> str:
   delete_closing = old_message[:-3] if old_message.endswith('```') else old_message
@@ -26,8 +105,10 @@ async def send_message(message: str, channel: discord.TextChannel) -> None:
   global cs_chat_last_message, cs_chat_duser_msg
 
   try:
-    cs_chat_last_message = await channel.send(f"```ansi\n{message}```")
-    cs_chat_duser_msg = False
+    with metrics.measure("discord.send"):
+      cs_chat_last_message[channel.id] = await channel.send(f"```ansi\n{message}```")
+    cs_chat_duser_msg[channel.id] = False
+    await save_anchor(anchor_key("chat", channel.id), cs_chat_last_message[channel.id].id)
   except Exception as e:
     logger.error(f"Ошибка при отправке сообщения в Discord: {e}")
 
@@ -35,77 +116,149 @@ async def send_message(message: str, channel: discord.TextChannel) -> None:
 async def edit_message(message: str, channel: discord.TextChannel) -> None:
   global cs_chat_last_message, cs_chat_max_chars
 
-  formatted_message = concat_message(cs_chat_last_message.content, message)
+  formatted_message = concat_message(cs_chat_last_message[channel.id].content, message)
 
-  if len(formatted_message) > cs_chat_max_chars:
-    send_message(formatted_message, channel)
+  if len(formatted_message) > min(cs_chat_max_chars, discord_max_chars):
+    await send_message(message, channel)
     return
   
   try:
-    cs_chat_last_message = await cs_chat_last_message.edit(content=formatted_message)
+    with metrics.measure("discord.edit"):
+      cs_chat_last_message[channel.id] = await cs_chat_last_message[channel.id].edit(content=formatted_message)
   except Exception as e:
     logger.error(f"Dbot: Ошибка при обновлении CS_CHAT в Discord: {e}")
 
+# -- chat_relay
+def chat_relay(channel: discord.TextChannel) -> ChatRelay:
+  """Буфер чата канала, создается при первой строке"""
+  if channel.id not in cs_chat_relays:
+
+    async def flush(lines: List[str]) -> None:
+      await flush_chat(lines, channel)
+
+    cs_chat_relays[channel.id] = ChatRelay(flush, interval=config.DISCORD_CHAT_FLUSH_INTERVAL,
+                                           error_handler=logger.exception)
+
+  return cs_chat_relays[channel.id]
+
+# -- flush_chat
+async def flush_chat(lines: List[str], channel: discord.TextChannel) -> None:
+  """Публикует пачку строк: дописывает последнее сообщение, а что не влезло - новыми сообщениями"""
+  max_chars = min(cs_chat_max_chars, discord_max_chars) - ansi_wrapper_chars
+
+  await save_unsaved_anchors()
+
+  # После перезапуска дописываем сообщение чата, если оно все еще последнее в канале
+  if channel.id not in cs_chat_last_message:
+    message = await reattach_message(anchor_key("chat", channel.id), channel, must_be_last=True)
+    if message:
+      cs_chat_last_message[channel.id] = message
+
+  for chunk in ChatRelay.pack(lines, max_chars):
+    if cs_chat_duser_msg.get(channel.id) or channel.id not in cs_chat_last_message:
+      await send_message(chunk, channel)
+    else:
+      await edit_message(chunk, channel)
+
 # -- edit_status_message
-async def edit_status_message(message: str, channel: discord.TextChannel):
+async def edit_status_message(message: str, channel: discord.TextChannel, server_id: str):
   global cs_status_message
 
-  # Проверка на существование сообщения
-  try:
-    cs_status_message = await channel.fetch_message(cs_status_message.id)
-  except discord.NotFound as err:
-    cs_status_message = None
-    await send_status_message(message, channel)
+  content = f"```ansi\n{message}```"
+
+  # Статус не изменился - запрос в Discord не нужен
+  if cs_status_message[server_id].content == content:
     return
 
+  # Правим закэшированное сообщение без fetch_message, пересоздаем только если его удалили
   try:
-    cs_status_message = await cs_status_message.edit(content=f"```ansi\n{message}```")
+    with metrics.measure("discord.edit"):
+      cs_status_message[server_id] = await cs_status_message[server_id].edit(content=content)
+  except discord.NotFound:
+    cs_status_message.pop(server_id, None)
+    await send_status_message(message, channel, server_id)
   except Exception as e:
+    # Ошибку видит Observer: снимок WBH_INFO не запомнится как разосланный и придет снова
     logger.error(f"Dbot: Ошибка при обновлении CS_STATUS в Discord: {e}")
+    raise
 
 # -- is_bot
 def is_bot(message: discord.Message):
   return message.author == dbot.bot.user
 
 # -- send_status_message
-async def send_status_message(message: str, channel: discord.TextChannel):
+async def send_status_message(message: str, channel: discord.TextChannel, server_id: str):
   global cs_status_message
-  await channel.purge(limit=10)
 
-  cs_status_message = await channel.send(f"```ansi\n{message}```")
+  # Статусы других серверов в этом же канале не трогаем
+  keep_ids = {status.id for status in cs_status_message.values()}
+  with metrics.measure("discord.purge"):
+    await channel.purge(limit=10, check=lambda msg: msg.id not in keep_ids)
+
+  with metrics.measure("discord.send"):
+    cs_status_message[server_id] = await channel.send(f"```ansi\n{message}```")
+
+  await save_anchor(anchor_key("status", channel.id, server_id), cs_status_message[server_id].id)
 
 # !SECTION
 
 # -- (route) get_member
 @nsroute.create_route("/GetMember")
 async def get_member(discord_id: int) -> discord.Member:
+  discord_id = int(discord_id)
   guild = dbot.bot.get_guild(config.GUILD_ID)
-  member: discord.Member 
+
+  # Кэш шлюза (при включенном intents.members) - без запросов к API
+  member: discord.Member = guild.get_member(discord_id)
+  if member is not None:
+    return member
+
+  if discord_id in member_cache:
+    return member_cache[discord_id]
 
   try:
-    member = await guild.fetch_member(discord_id)
+    with metrics.measure("discord.fetch_member"):
+      member = await guild.fetch_member(discord_id)
   except discord.NotFound as err:
     member = None
 
-
+  member_cache[discord_id] = member
   return member
+
+# -- ev_member_update
+@observer.subscribe(Event.BE_MEMBER_UPDATE)
+async def ev_member_update(data) -> None:
+  member_cache.pop(int(data['user_id']), None)
+
+# -- ev_member_invalidated
+@observer.subscribe(Event.RD_INVALIDATED)
+async def ev_member_invalidated(data) -> None:
+  """Участник изменился в другом экземпляре бота (discord_id None - сбросить весь кэш)"""
+  if data['kind'] != "member":
+    return
+
+  if data['discord_id'] is None:
+    member_cache.clear()
+  else:
+    member_cache.pop(int(data['discord_id']), None)
   
 # -- ev_message_from_cs
 @observer.subscribe(Event.WBH_MESSAGE)
 async def ev_message_from_cs(data) -> None:
-  global cs_chat_duser_msg
   message = data['message']
+  settings = server_settings(data.get('server_id'))
+
+  if not settings:
+    logger.error(f"DBot: Неизвестный server_id: {data.get('server_id')}")
+    return
 
-  channel = dbot.bot.get_channel(config.CS_CHAT_CHNL_ID)
+  channel = dbot.bot.get_channel(settings.get('chat_channel_id', config.CS_CHAT_CHNL_ID))
 
   if not channel:
     logger.error("DBot: CS_CHAT_CHANNEL Не найден")
     return
 
-  if cs_chat_duser_msg or not cs_chat_last_message:
-    await send_message(message, channel)
-  else:
-    await edit_message(message, channel)
+  chat_relay(channel).add(message)
 
 # -- ev_info
 @observer.subscribe(Event.WBH_INFO)
@@ -113,19 +266,34 @@ async def ev_info(data) -> None:
   global cs_status_message
 
   info_message = data['info_message']
-  channel = dbot.bot.get_channel(config.INFO_CHANNEL_ID)
+  server_id = data.get('server_id') or next(iter(config.CS_SERVERS))
+  settings = server_settings(server_id)
+
+  if not settings:
+    logger.error(f"DBot: Неизвестный server_id: {server_id}")
+    return
+
+  channel = dbot.bot.get_channel(settings.get('info_channel_id', config.INFO_CHANNEL_ID))
 
   if not channel:
     logger.error("DBot: CS_INFO_CHANNEL Не найден")
     return
 
-  if cs_status_message:
-    await edit_status_message(info_message, channel)
+  await save_unsaved_anchors()
+
+  # После перезапуска продолжаем править старое сообщение статуса вместо purge и новой отправки
+  if server_id not in cs_status_message:
+    message = await reattach_message(anchor_key("status", channel.id, server_id), channel)
+    if message:
+      cs_status_message[server_id] = message
+
+  if server_id in cs_status_message:
+    await edit_status_message(info_message, channel, server_id)
   else:
-    await send_status_message(info_message, channel)
+    await send_status_message(info_message, channel, server_id)
 
 # -- ev_message_from_dis
 @observer.subscribe(Event.BE_MESSAGE)
 async def ev_message_from_dis(data) -> None:
   global cs_chat_duser_msg
-  cs_chat_duser_msg = True
\ No newline at end of file
+  cs_chat_duser_msg[data[Param.Message].channel.id] = True
\ No newline at end of file
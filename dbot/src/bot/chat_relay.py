@@ -0,0 +1,123 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+# SECTION Class ChatRelay
+class ChatRelay:
+  # -- __init__()
+  def __init__(self, flush: Callable[[List[str]], Awaitable[None]], interval: float = 1.0,
+               error_handler: Optional[Callable[[str], None]] = None) -> None:
+    """
+    Буфер строк чата CS для одного канала Discord.
+
+    Строки копятся и уходят в flush пачкой не чаще раза в interval секунд,
+    поэтому на активном сервере бот не упирается в rate limit Discord на канал.
+    Первая строка после паузы уходит сразу. Порядок строк сохраняется.
+
+    :param flush: Корутина, публикующая пачку строк (одним edit/send или несколькими, если не влезает).
+    :param interval: Минимальный интервал между публикациями в секундах.
+    :param error_handler: Куда сообщать об ошибках публикации (по умолчанию logging.exception).
+    """
+    self.interval: float = interval
+
+    self._flush: Callable[[List[str]], Awaitable[None]] = flush
+    self._error_handler: Callable[[str], None] = error_handler or logging.exception
+    self._lines: List[str] = []
+    self._flush_task: Optional[asyncio.Task] = None
+    self._lock: asyncio.Lock = asyncio.Lock()
+    self._last_flush: float = 0.0
+
+    # Статистика склейки
+    self.flushes: int = 0
+    self.lines: int = 0
+    self.merged_last: int = 0
+    self.merged_max: int = 0
+
+  # -- add()
+  def add(self, line: str) -> None:
+    """
+    Добавляет строку в буфер и планирует публикацию.
+
+    :param line: Отформатированная строка чата.
+    """
+    self._lines.append(line)
+
+    if self._flush_task is None or self._flush_task.done():
+      self._flush_task = asyncio.create_task(self._flush_later())
+
+  # -- _flush_later()
+  async def _flush_later(self) -> None:
+    # Строки, пришедшие во время публикации, уходят следующей пачкой
+    while self._lines:
+      delay = self._last_flush + self.interval - time.monotonic()
+      if delay > 0:
+        await asyncio.sleep(delay)
+      await self.flush()
+
+  # -- flush()
+  async def flush(self) -> None:
+    """Публикует все накопленные строки."""
+    async with self._lock:
+      lines, self._lines = self._lines, []
+      if not lines:
+        return
+
+      self._last_flush = time.monotonic()
+      self.flushes += 1
+      self.lines += len(lines)
+      self.merged_last = len(lines)
+      self.merged_max = max(self.merged_max, len(lines))
+
+      # Ошибка одной пачки не должна останавливать публикацию следующих
+      try:
+        await self._flush(lines)
+      except Exception as err:
+        self._error_handler(f"ChatRelay: ошибка публикации: {err}")
+
+  # -- stats()
+  def stats(self) -> Dict[str, Any]:
+    """
+    Статистика склейки для мониторинга.
+
+    :return: Число публикаций, строк и строк на одну публикацию (последняя, средняя, максимум).
+    """
+    return {
+      "flushes": self.flushes,
+      "lines": self.lines,
+      "pending": len(self._lines),
+      "merged_last": self.merged_last,
+      "merged_avg": self.lines / self.flushes if self.flushes else 0.0,
+      "merged_max": self.merged_max,
+    }
+
+  # -- pack()
+  @staticmethod
+  def pack(lines: List[str], max_chars: int) -> List[str]:
+    """
+    Жадно склеивает строки по порядку в куски не длиннее max_chars.
+    Строка длиннее max_chars делится на несколько кусков.
+
+    :param lines: Строки в порядке поступления.
+    :param max_chars: Максимальная длина куска.
+    :return: Склеенные куски.
+    """
+    chunks: List[str] = []
+    current: str = ""
+
+    # Длинные строки режем на части по max_chars, дальше они склеиваются как обычные
+    parts = (line[start:start + max_chars] for line in lines for start in range(0, len(line), max_chars))
+
+    for line in parts:
+      if current and len(current) + len(line) > max_chars:
+        chunks.append(current)
+        current = line
+      else:
+        current += line
+
+    if current:
+      chunks.append(current)
+
+    return chunks
+
+# !SECTION
@@ -1,30 +1,68 @@
 from observer.observer_client import nsroute, observer, Event, logger
+from bot.search_index import SearchIndex
 import discord
 
-cache_online_players: set = {}
+import config
+import time
+
+# Онлайн игроки по server_id
+cache_online_players: dict = {}
+
+# Локальные индексы для автодополнения по ключам Redis, обновляются событием RD_UPDATED
+search_indexes: dict = {
+  "last_players": SearchIndex(max_entries=config.LAST_PLAYERS_MAX_ENTRIES, time_budget=config.AUTOCOMPLETE_TIME_BUDGET),
+  "banned_players": SearchIndex(time_budget=config.AUTOCOMPLETE_TIME_BUDGET),
+  "map_list_all": SearchIndex(time_budget=config.AUTOCOMPLETE_TIME_BUDGET),
+  "map_list_active": SearchIndex(time_budget=config.AUTOCOMPLETE_TIME_BUDGET),
+}
+
+@observer.subscribe(Event.RD_UPDATED)
+async def ev_redis_updated(data):
+  index: SearchIndex = search_indexes.get(data['table'])
+  if index is None:
+    return
+
+  if data['reset']:
+    index.reset(data['added'])
+  else:
+    for name in data['removed']:
+      index.remove(name)
+    index.update(data['added'])
+
+  # Тот же срок хранения, что и в Redis
+  if data['table'] == "last_players" and config.LAST_PLAYERS_MAX_AGE:
+    index.prune(time.time() - config.LAST_PLAYERS_MAX_AGE)
 
 @observer.subscribe(Event.WBH_INFO)
 async def ev_online_players(data):
   global cache_online_players
-  cache_online_players = set(player['name'] for player in data['current_players'])
+  server_id = data.get('server_id') or next(iter(config.CS_SERVERS))
+  cache_online_players[server_id] = set(player['name'] for player in data['current_players'])
+
+# -- online_players
+def online_players(interaction: discord.Interaction) -> set:
+  """Онлайн игроки сервера, выбранного в команде, или всех серверов"""
+  server_id = getattr(interaction.namespace, 'server', None)
+  if server_id:
+    return cache_online_players.get(server_id, set())
+
+  return set().union(*cache_online_players.values())
+
+async def servers(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
+  filter_servers: list = [server_id for server_id in config.CS_SERVERS if current.lower() in server_id.lower()][:25]
+  return [discord.app_commands.Choice(name=server_id, value=server_id) for server_id in filter_servers]
 
 async def players_online(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
-  global cache_online_players
-  filter_players: list = [player_name for player_name in cache_online_players if current.lower() in player_name.lower()][:25]
+  filter_players: list = [player_name for player_name in online_players(interaction) if current.lower() in player_name.lower()][:25]
   return [discord.app_commands.Choice(name=player, value=player) for player in filter_players]
 
 async def ban_online(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
-  global cache_online_players
-  filter_players: list = [player_name for player_name in cache_online_players if current.lower() in player_name.lower()][:25] 
+  filter_players: list = [player_name for player_name in online_players(interaction) if current.lower() in player_name.lower()][:25] 
   return [discord.app_commands.Choice(name=player, value=player) for player in filter_players]
 
 async def ban_offline(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
-  global cache_online_players
-  offline_players: list = await nsroute.call_route("/redis/get_offline_players") or []
-
-  offline_set: set = set(offline_players)
-  filtered_offline_players: list = list(offline_set - cache_online_players)
-  filter_players: list = [player_name for player_name in filtered_offline_players if current.lower() in player_name.lower()][:25] 
+  online: set = set().union(*cache_online_players.values())
+  filter_players: list = search_indexes["last_players"].search(current, exclude=online)
   return [discord.app_commands.Choice(name=player, value=player) for player in filter_players]
 
 async def ban_minutes(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
@@ -38,20 +76,14 @@ async def ban_minutes(interaction: discord.Interaction, current: str) -> list[di
 				]
 
 async def unban(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
-  banned_players: list = await nsroute.call_route("/redis/get_banned_players") or []
-
-  filter_players: list = [player_name for player_name in banned_players if current.lower() in player_name.lower()][:25] 
+  filter_players: list = search_indexes["banned_players"].search(current)
   return [discord.app_commands.Choice(name=player, value=player) for player in filter_players]
 
 async def maps_active(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
-  map_list: list = await nsroute.call_route("/redis/get_map_list_active") or []
-
-  filter_maps: list = [map_name for map_name in map_list if current.lower() in map_name.lower()][:25]
+  filter_maps: list = search_indexes["map_list_active"].search(current)
   return [discord.app_commands.Choice(name=map, value=map) for map in filter_maps]
 
 async def maps_all(interaction: discord.Interaction, current: str) -> list[discord.app_commands.Choice[str]]:
-  map_list: list = await nsroute.call_route("/redis/get_map_list_all") or []
-
-  filter_maps: list = [map_name for map_name in map_list if current.lower() in map_name.lower()][:25]
+  filter_maps: list = search_indexes["map_list_all"].search(current)
   return [discord.app_commands.Choice(name=map, value=map) for map in filter_maps]
 
@@ -1,5 +1,5 @@
 import discord.ext.tasks
-from observer.observer_client import logger, observer, Event, Param, nsroute
+from observer.observer_client import logger, observer, Event, Param, nsroute, metrics
 
 import discord
 import discord.ext
@@ -11,10 +11,16 @@ import config
 
 bot = dbot.bot
 
+# Каналы чата всех серверов из config.CS_SERVERS
+cs_chat_channel_ids: set = {settings.get('chat_channel_id', config.CS_CHAT_CHNL_ID) for settings in config.CS_SERVERS.values()}
+
 # -- on_ready
 @bot.event
 async def on_ready():
   logger.info(f"DBot {bot.user.name} запущен")
+
+  if config.METRICS_LOG_INTERVAL and not metrics_task.is_running():
+    metrics_task.start()
   
   await observer.notify(Event.BE_READY)
 
@@ -24,7 +30,7 @@ async def on_message(message: discord.Message):
   if message.author == bot.user:
     return
   
-  if message.channel.id == config.CS_CHAT_CHNL_ID:
+  if message.channel.id in cs_chat_channel_ids:
     await observer.notify(Event.BE_MESSAGE, {
       Param.Message: message
     })
@@ -51,17 +57,29 @@ async def setup_hook():
 # -- (task) status_task
 @discord.ext.tasks.loop(seconds=config.STATUS_INTERVAL)
 async def status_task():
-  await observer.notify(Event.BT_CS_Status)
+  await observer.publish(Event.BT_CS_Status)
 
 # -- (task) cs_connect_task
 @discord.ext.tasks.loop(seconds=config.CS_RECONNECT_INTERVAL)
 async def cs_connect_task():
   await nsroute.call_route("/connect_to_cs") 
 
+# -- (task) metrics_task
+@discord.ext.tasks.loop(seconds=config.METRICS_LOG_INTERVAL or 60)
+async def metrics_task():
+  report = metrics.report()
+  if report:
+    logger.info(f"Метрики:\n{report}")
+
+  queue = observer.queue_stats()
+  logger.info(f"Очередь событий: {queue['depth']}/{queue['maxsize']}, lag {queue['lag_last'] * 1000:.1f} мс "
+              f"(max {queue['lag_max'] * 1000:.1f} мс), выкинуто {queue['dropped']}")
+
 # -- ev_cs_connected
 @observer.subscribe(Event.CS_CONNECTED)
-async def ev_cs_connected():
-  if cs_connect_task.is_running():
+async def ev_cs_connected(data):
+  # Переподключение нужно, пока хотя бы один сервер отключен
+  if not data['disconnected'] and cs_connect_task.is_running():
     cs_connect_task.cancel()
 
   if not status_task.is_running():
@@ -69,8 +87,9 @@ async def ev_cs_connected():
 
 # -- ev_cs_disconnected
 @observer.subscribe(Event.CS_DISCONNECTED)
-async def ev_cs_disconnected():
-  if status_task.is_running():
+async def ev_cs_disconnected(data):
+  # Статус опрашиваем, пока подключен хотя бы один сервер
+  if not data['connected'] and status_task.is_running():
     status_task.cancel()
 
   if not cs_connect_task.is_running():
@@ -0,0 +1,231 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import heapq
+import re
+import time
+import unicodedata
+
+# Разделители слов в именах: клан-теги, подчеркивания в картах и т.п.
+_token_split = re.compile(r"[\W_]+")
+
+# -- normalize()
+def normalize(text: str) -> str:
+  """Приводит строку к виду для сравнения: NFKC (полноширинные и составные символы) и casefold."""
+  return unicodedata.normalize("NFKC", text).casefold()
+
+# -- prefix_distance()
+def prefix_distance(query: str, target: str, max_distance: int) -> int:
+  """
+  Расстояние редактирования (с перестановкой соседних символов) от query до ближайшего префикса target.
+
+  :param query: Введенная строка.
+  :param target: Имя или слово имени.
+  :param max_distance: Порог. Как только расстояние точно больше порога, счет прекращается.
+  :return: Расстояние или max_distance + 1, если оно больше порога.
+  """
+  target = target[:len(query) + max_distance]
+  previous = None
+  row = list(range(len(target) + 1))
+
+  for i in range(1, len(query) + 1):
+    current = [i] + [0] * len(target)
+    for j in range(1, len(target) + 1):
+      cost = 0 if query[i - 1] == target[j - 1] else 1
+      current[j] = min(row[j] + 1, current[j - 1] + 1, row[j - 1] + cost)
+      if previous and i > 1 and j > 1 and query[i - 1] == target[j - 2] and query[i - 2] == target[j - 1]:
+        current[j] = min(current[j], previous[j - 2] + 1)
+
+    if min(current) > max_distance:
+      return max_distance + 1
+    previous, row = row, current
+
+  return min(min(row), max_distance + 1)
+
+# SECTION Class SearchIndex
+class SearchIndex:
+  # -- __init__()
+  def __init__(self, gram_size: int = 3, max_entries: int = 0, time_budget: float = 0.05) -> None:
+    """
+    Локальный индекс имен для автодополнения (игроки, баны, карты).
+
+    Имена хранятся уже нормализованными (см. normalize) и разбиты на n-граммы длиной от 1 до gram_size,
+    поэтому поиск подстроки - это пересечение нескольких множеств, а не проход по всем именам.
+    У каждого имени есть счет (например, время последнего появления): выше счет - выше в выдаче.
+
+    :param gram_size: Максимальная длина n-граммы.
+    :param max_entries: Сколько имен хранить (0 - без ограничения), лишние с меньшим счетом удаляются.
+    :param time_budget: Сколько секунд запрос может потратить на нечеткий поиск.
+    """
+    self.gram_size: int = gram_size
+    self.max_entries: int = max_entries
+    self.time_budget: float = time_budget
+
+    self._names: Dict[str, Tuple[str, float]] = {}
+    self._tokens: Dict[str, List[str]] = {}
+    self._grams: Dict[str, Set[str]] = {}
+
+  # -- __len__()
+  def __len__(self) -> int:
+    return len(self._names)
+
+  # -- __contains__()
+  def __contains__(self, name: str) -> bool:
+    return name in self._names
+
+  # -- _grams_of()
+  def _grams_of(self, lowered: str) -> Set[str]:
+    """Все подстроки длиной от 1 до gram_size."""
+    return {lowered[i:i + size]
+            for size in range(1, self.gram_size + 1)
+            for i in range(len(lowered) - size + 1)}
+
+  # -- add()
+  def add(self, name: str, score: float = 0.0) -> None:
+    """
+    Добавляет имя или обновляет его счет.
+
+    :param name: Имя в исходном регистре.
+    :param score: Счет имени.
+    """
+    if name in self._names:
+      self._names[name] = (self._names[name][0], score)
+      return
+
+    lowered = normalize(name)
+    self._names[name] = (lowered, score)
+    self._tokens[name] = [token for token in _token_split.split(lowered) if token]
+    for gram in self._grams_of(lowered):
+      self._grams.setdefault(gram, set()).add(name)
+
+  # -- update()
+  def update(self, names: Dict[str, float]) -> None:
+    """
+    Добавляет несколько имен и соблюдает max_entries.
+
+    :param names: Имя -> счет.
+    """
+    for name, score in names.items():
+      self.add(name, score)
+
+    if self.max_entries and len(self._names) > self.max_entries:
+      excess = len(self._names) - self.max_entries
+      for name in heapq.nsmallest(excess, self._names, key=lambda name: self._names[name][1]):
+        self.remove(name)
+
+  # -- remove()
+  def remove(self, name: str) -> None:
+    """
+    Удаляет имя, если оно есть.
+
+    :param name: Имя в исходном регистре.
+    """
+    entry = self._names.pop(name, None)
+    if entry is None:
+      return
+    del self._tokens[name]
+
+    for gram in self._grams_of(entry[0]):
+      names = self._grams.get(gram)
+      if names is None:
+        continue
+      names.discard(name)
+      if not names:
+        del self._grams[gram]
+
+  # -- prune()
+  def prune(self, min_score: float) -> None:
+    """
+    Удаляет имена со счетом меньше min_score (например, игроков старше срока хранения).
+
+    :param min_score: Минимальный счет.
+    """
+    for name in [name for name, (_, score) in self._names.items() if score < min_score]:
+      self.remove(name)
+
+  # -- reset()
+  def reset(self, names: Dict[str, float]) -> None:
+    """
+    Заменяет содержимое индекса.
+
+    :param names: Имя -> счет.
+    """
+    self._names = {}
+    self._tokens = {}
+    self._grams = {}
+    self.update(names)
+
+  # -- candidates()
+  def candidates(self, query: str) -> Iterable[str]:
+    """
+    Имена, содержащие query как подстроку (без учета регистра).
+
+    :param query: Нормализованная строка поиска.
+    :return: Имена без определенного порядка.
+    """
+    if not query:
+      return self._names.keys()
+
+    if len(query) <= self.gram_size:
+      return self._grams.get(query, ())
+
+    grams = sorted((self._grams.get(query[i:i + self.gram_size], set())
+                    for i in range(len(query) - self.gram_size + 1)), key=len)
+    if not grams[0]:
+      return ()
+
+    # Все n-граммы есть в имени еще не значит, что есть вся подстрока - проверяем
+    matched = set.intersection(*grams)
+    return [name for name in matched if query in self._names[name][0]]
+
+  # -- search()
+  def search(self, query: str, limit: int = 25, exclude: Optional[Set[str]] = None) -> List[str]:
+    """
+    Ищет имена и ранжирует их.
+
+    Порядок: имя начинается с query -> слово имени начинается с query -> query внутри имени ->
+    нечеткое совпадение (опечатки) с началом имени или слова. Внутри группы - по счету (свежие выше),
+    затем по алфавиту. Нечеткий поиск ищет только если точных совпадений меньше limit
+    и укладывается в time_budget. Отбираются limit лучших без полной сортировки.
+
+    :param query: Строка поиска (то, что пользователь уже ввел).
+    :param limit: Сколько имен вернуть (в Discord не больше 25 вариантов).
+    :param exclude: Имена, которые не нужно показывать.
+    :return: Имена в порядке ранжирования.
+    """
+    query = normalize(query)
+    ranks: Dict[str, Tuple[int, int, float, str]] = {}
+
+    for name in self.candidates(query):
+      if exclude and name in exclude:
+        continue
+
+      lowered, score = self._names[name]
+      if lowered.startswith(query):
+        group = 0
+      elif any(token.startswith(query) for token in self._tokens[name]):
+        group = 1
+      else:
+        group = 2
+      ranks[name] = (group, 0, -score, lowered)
+
+    if len(query) >= 2 and len(ranks) < limit:
+      self._fuzzy(query, ranks, exclude)
+
+    return heapq.nsmallest(limit, ranks, key=ranks.__getitem__)
+
+  # -- _fuzzy()
+  def _fuzzy(self, query: str, ranks: Dict[str, Tuple[int, int, float, str]], exclude: Optional[Set[str]]) -> None:
+    """Добавляет в ranks имена с опечатками относительно query, пока не кончится time_budget."""
+    max_distance = 1 if len(query) <= 4 else 2
+    deadline = time.perf_counter() + self.time_budget
+
+    for checked, (name, (lowered, score)) in enumerate(self._names.items()):
+      if checked % 64 == 0 and time.perf_counter() > deadline:
+        break
+      if name in ranks or (exclude and name in exclude):
+        continue
+
+      distance = min(prefix_distance(query, part, max_distance) for part in [lowered, *self._tokens[name]])
+      if distance <= max_distance:
+        ranks[name] = (3, distance, -score, lowered)
+
+# !SECTION
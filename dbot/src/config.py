@@ -30,10 +30,67 @@ STATUS_INTERVAL = 10
 CS_RECONNECT_INTERVAL = 10
 #-------------------------------------------------------------------
 
+#-------------------------------------------------------------------
+# New in 0.3.2
+# Сколько RCON-команд может одновременно ждать ответа от сервера
+# (у каждой свое UDP-соединение). Остальные ждут в очереди по приоритету:
+# админские команды -> чат -> статус
+CS_RCON_MAX_IN_FLIGHT = 2
+
+# Сообщения из дискорда, пришедшие за это окно (сек), уходят на сервер одним RCON-пакетом
+CS_CHAT_BATCH_WINDOW = 0.2
+# Максимальная длина RCON-пакета со склеенной командой. HLDS обрезает пакет до 1024 байт,
+# заголовок (challenge и пароль) вычитается из этого лимита
+CS_CHAT_BATCH_MAX_BYTES = 1024
+
+# Строки чата CS публикуются в Discord одним сообщением/правкой не чаще раза в это время (сек),
+# чтобы не упираться в rate limit Discord на канал
+DISCORD_CHAT_FLUSH_INTERVAL = 1.0
+
+# Кэш участников дискорда для чата CS (если участника нет в кэше шлюза): размер и время жизни (сек)
+MEMBER_CACHE_SIZE = 1024
+MEMBER_CACHE_TTL = 3600
+
+# Кэш привязок SteamID -> Discord в памяти процесса (поверх хэша в Redis):
+# размер, время жизни найденных и отсутствующих привязок (сек)
+# Изменения приходят через REDIS_INVALIDATION_CHANNEL, время жизни - страховка на случай потерянных сообщений
+STEAM_CACHE_SIZE = 4096
+STEAM_CACHE_TTL = 3600
+STEAM_CACHE_MISS_TTL = 600
+
+# Таймаут (сек) на одного подписчика для событий, рассылаемых одновременно (Dispatch.CONCURRENT)
+OBSERVER_SUBSCRIBER_TIMEOUT = 10
+
+# Фоновая очередь событий (вебхуки отвечают сразу, а событие обрабатывается позже)
+OBSERVER_QUEUE_SIZE = 1000
+OBSERVER_WORKERS = 4
+# Что делать при переполнении: 'drop_oldest', 'coalesce' или 'block'
+OBSERVER_OVERFLOW = 'drop_oldest'
+
+# Как часто (сек) писать в лог время обработки событий и nsroute (p50/p95/p99). 0 - не писать
+METRICS_LOG_INTERVAL = 300
+# Сколько секунд /metrics отдает закэшированный ответ (частый опрос не нагружает бота)
+METRICS_RENDER_TTL = 1
+#-------------------------------------------------------------------
+
 # Хост и пароль для подключения к серверу (например, игровому серверу)
 CS_HOST = '127.0.0.1'  # Локальный хост
 CS_RCON_PASSWORD = '12345'  # Пароль для удаленного управления
 
+# New in 0.3.2: несколько серверов в одном процессе бота.
+# Ключ - server_id, плагин передает его в вебхуке полем "server_id".
+# Вебхук без server_id и команды без параметра server относятся к первому серверу.
+# chat_channel_id / info_channel_id можно не указывать - возьмутся общие каналы выше
+CS_SERVERS = {
+  'main': {
+    'host': CS_HOST,
+    'port': 27015,
+    'password': CS_RCON_PASSWORD,
+    'chat_channel_id': CS_CHAT_CHNL_ID,
+    'info_channel_id': INFO_CHANNEL_ID,
+  },
+}
+
 # Настройки подключения к базе данных
 DB_HOST = '127.0.0.1'  # Хост базы данных
 DB_PORT = 3306  # Порт базы данных, по дефолту MySQL = 3306
@@ -41,6 +98,16 @@ DB_USER = 'root'  # Имя пользователя базы данных
 DB_PASSWORD = ''  # Пароль пользователя базы данных
 DB_NAME = 'create_test'  # Имя базы данных
 
+# Пул соединений MySQL: сколько соединений открыто всегда (подготавливаются при запуске) и предел
+DB_POOL_MINSIZE = 2
+DB_POOL_MAXSIZE = 10
+# Соединения старше (сек) пересоздаются при выдаче из пула. Должно быть меньше wait_timeout MySQL (по умолчанию 8 ч),
+# иначе первый запрос после ночного простоя падает на соединении, которое MySQL уже закрыл
+DB_POOL_RECYCLE = 3600
+DB_CONNECT_TIMEOUT = 10
+# Автокоммит: чтение не оставляет соединение в открытой транзакции (такие соединения пул закрывает при возврате)
+DB_AUTOCOMMIT = True
+
 
 # Порт веб-сервера, на котором будет работать приложение
 WEB_HOST_ADDRESS = '0.0.0.0'
@@ -50,3 +117,25 @@ WEB_ALLOWED_IPS = ['127.0.0.1']
 # redis (универсальные значения)
 REDIS_HOST = '127.0.0.1'
 REDIS_PORT = 6379
+# Пул соединений: размер (при нехватке запрос ждет свободное соединение), проверка простаивающих
+# соединений PING (сек) и таймауты ответа и подключения (сек)
+REDIS_MAX_CONNECTIONS = 16
+REDIS_HEALTH_CHECK_INTERVAL = 30
+REDIS_SOCKET_TIMEOUT = 5
+REDIS_SOCKET_CONNECT_TIMEOUT = 5
+# Как часто (сек) проверять соединение с Redis. При обрыве переподключение идет
+# с задержкой 1, 2, 4... сек, но не больше REDIS_RECONNECT_MAX_DELAY
+REDIS_HEARTBEAT_INTERVAL = 10
+REDIS_RECONNECT_MAX_DELAY = 60
+
+# Канал pub/sub, через который экземпляры бота сообщают друг другу об изменениях
+# (карты, баны, игроки, привязки SteamID, участники) и сбрасывают локальные кэши
+REDIS_INVALIDATION_CHANNEL = "dbot:invalidate"
+
+# История игроков (LastPlayers): сколько хранить записей и как долго (сек). 0 - без ограничения.
+# Обрезается при каждой записи
+LAST_PLAYERS_MAX_ENTRIES = 2000
+LAST_PLAYERS_MAX_AGE = 30 * 24 * 3600
+
+# Автодополнение: сколько секунд один запрос может искать имена с опечатками
+AUTOCOMPLETE_TIME_BUDGET = 0.05
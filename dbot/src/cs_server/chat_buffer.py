@@ -0,0 +1,120 @@
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import logging
+
+# Challenge - 32-битное число со знаком, в пакете занимает до 11 символов
+RCON_CHALLENGE_MAX_LEN = 11
+
+# SECTION Functions
+# -- rcon_overhead()
+def rcon_overhead(password: str) -> int:
+  """
+  Длина RCON-пакета помимо самой команды: 0xFFFFFFFF + "rcon <challenge> <password> ".
+
+  :param password: RCON-пароль сервера.
+  :return: Длина заголовка в байтах.
+  """
+  return len(b"\xFF\xFF\xFF\xFFrcon ") + RCON_CHALLENGE_MAX_LEN + 1 + len(password.encode()) + 1
+
+# -- quote_arg()
+def quote_arg(value: str) -> str:
+  """
+  Оборачивает пользовательский текст в кавычки так, чтобы консоль не разбила его на несколько команд.
+  Кавычки и ";" внутри текста заменяются, чтобы текст не мог закрыть аргумент или склеенную команду.
+
+  :param value: Пользовательский текст.
+  :return: Аргумент консольной команды.
+  """
+  return "\"" + value.replace("\"", "'").replace(";", ",").replace("\r", " ").replace("\n", " ") + "\""
+
+# !SECTION
+
+# SECTION Class ChatBuffer
+class ChatBuffer:
+  # -- __init__()
+  def __init__(self, send: Callable[[str], Awaitable[None]], window: float = 0.2, max_bytes: int = 1000, separator: str = ";",
+               overhead: int = 0, error_handler: Optional[Callable[[str], None]] = None) -> None:
+    """
+    Буфер исходящих консольных команд.
+
+    Команды, пришедшие в течение window секунд, склеиваются через separator
+    в как можно меньшее количество RCON-пакетов не длиннее max_bytes
+    вместе с заголовком пакета (overhead).
+    Порядок команд сохраняется.
+
+    :param send: Корутина, отправляющая одну склеенную команду.
+    :param window: Окно накопления в секундах.
+    :param max_bytes: Максимальная длина RCON-пакета в байтах.
+    :param separator: Разделитель консольных команд.
+    :param overhead: Длина заголовка пакета в байтах (см. rcon_overhead()).
+    :param error_handler: Куда сообщать об ошибках отправки (по умолчанию logging.exception).
+    """
+    self.window: float = window
+    self.max_bytes: int = max_bytes - overhead
+    self.separator: str = separator
+
+    self._send: Callable[[str], Awaitable[None]] = send
+    self._error_handler: Callable[[str], None] = error_handler or logging.exception
+    self._commands: List[str] = []
+    self._flush_task: Optional[asyncio.Task] = None
+    self._lock: asyncio.Lock = asyncio.Lock()
+
+  # -- add()
+  def add(self, command: str) -> None:
+    """
+    Добавляет команду в буфер и планирует отправку по истечении окна.
+
+    :param command: Консольная команда.
+    """
+    self._commands.append(command)
+
+    if self._flush_task is None or self._flush_task.done():
+      self._flush_task = asyncio.create_task(self._flush_later())
+
+  # -- _flush_later()
+  async def _flush_later(self) -> None:
+    # Команды, пришедшие во время отправки, уходят следующим окном
+    while self._commands:
+      await asyncio.sleep(self.window)
+      await self.flush()
+
+  # -- flush()
+  async def flush(self) -> None:
+    """Отправляет все накопленные команды."""
+    async with self._lock:
+      commands, self._commands = self._commands, []
+
+      # Ошибка одной пачки не должна терять остальные
+      for batch in self.pack(commands):
+        try:
+          await self._send(batch)
+        except Exception as err:
+          self._error_handler(f"ChatBuffer: ошибка отправки: {err}")
+
+  # -- pack()
+  def pack(self, commands: List[str]) -> List[str]:
+    """
+    Жадно склеивает команды по порядку, не превышая max_bytes.
+    Команда длиннее max_bytes уходит отдельно.
+
+    :param commands: Команды в порядке поступления.
+    :return: Склеенные команды.
+    """
+    batches: List[str] = []
+    current: str = ""
+
+    for command in commands:
+      candidate = command if not current else current + self.separator + command
+
+      if current and len(candidate.encode()) > self.max_bytes:
+        batches.append(current)
+        current = command
+      else:
+        current = candidate
+
+    if current:
+      batches.append(current)
+
+    return batches
+
+# !SECTION
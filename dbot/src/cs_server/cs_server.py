@@ -1,71 +1,148 @@
-from observer.observer_client import logger, observer, Event, Param, Color, nsroute
-from cs_server.csrcon import CSRCON, ConnectionError as CSConnectionError, CommandExecutionError
+from observer.observer_client import logger, observer, metrics, Event, Param, Color, nsroute
+from cs_server.csrcon import CSRCON, CommandPriority, ConnectionError as CSConnectionError, CommandExecutionError
+from cs_server.chat_buffer import ChatBuffer, quote_arg, rcon_overhead
+from cs_server.registry import ServerRegistry
+
+from typing import Dict
 
 import discord
 
 import config
 
 # -- init
-cs_server: CSRCON = CSRCON(host=config.CS_HOST,
-                           password=config.CS_RCON_PASSWORD)
+servers: ServerRegistry = ServerRegistry()
+chat_buffers: Dict[str, ChatBuffer] = {}
+
+# -- make_chat_sender
+def make_chat_sender(server_id: str, cs_server: CSRCON) -> callable:
+
+  async def send_chat_batch(command: str) -> None:
+    try:
+      await cs_server.exec(command, CommandPriority.CHAT)
+    except CommandExecutionError as err:
+      logger.error(f"CS Server [{server_id}]: {err}")
+
+  return send_chat_batch
+
+for server_id, settings in config.CS_SERVERS.items():
+  server = CSRCON(host=settings['host'],
+                  port=settings.get('port', 27015),
+                  password=settings['password'],
+                  max_in_flight=config.CS_RCON_MAX_IN_FLIGHT)
+  servers.add(server_id, server)
+
+  chat_buffers[server_id] = ChatBuffer(make_chat_sender(server_id, server),
+                                       window=config.CS_CHAT_BATCH_WINDOW,
+                                       max_bytes=config.CS_CHAT_BATCH_MAX_BYTES,
+                                       overhead=rcon_overhead(settings['password']),
+                                       error_handler=logger.exception)
+
+# -- metrics (/metrics)
+metrics.register_histograms("dbot_rcon_rtt_seconds", "Время выполнения RCON-команды (без ожидания в очереди)",
+                            lambda: {server_id: servers.get(server_id).rtt for server_id in servers.ids()},
+                            label="server")
+metrics.register_counter("dbot_rcon_timeouts_total", "RCON-команды, не дождавшиеся ответа",
+                         lambda: {server_id: servers.get(server_id).timeouts for server_id in servers.ids()},
+                         label="server")
+metrics.register_gauge("dbot_rcon_queue_depth", "RCON-команды в очереди",
+                       lambda: {server_id: servers.get(server_id).queue_depth for server_id in servers.ids()},
+                       label="server")
 
 # SECTION Utlities
 
 # -- @require_connection
 def require_connection(func) -> callable:
+  """
+    Находит сервер по data['server_id'] (по умолчанию - первый)
+    и передает его в обработчик вторым аргументом
+  """
   
-  async def wrapper(*args, **kwargs) -> callable:
-    if cs_server.connected:
-      return await func(*args, **kwargs)
+  async def wrapper(data, *args, **kwargs) -> callable:
+    server_id = data.get('server_id')
+    cs_server = servers.get(server_id)
+
+    if cs_server and cs_server.connected:
+      return await func(data, cs_server, *args, **kwargs)
 
-    if 'data' in kwargs and kwargs['data']:
-      await kwargs['data'][Param.Interaction].followup.send('Нет подключения к серверу', ephemeral=True)
+    if Param.Interaction in data:
+      await data[Param.Interaction].followup.send('Нет подключения к серверу', ephemeral=True)
     
-    logger.error("CS Server: Нет связи с CS")
+    logger.error(f"CS Server [{server_id or servers.default_id}]: Нет связи с CS")
   
   return wrapper
 
+# -- chat_server_ids
+def chat_server_ids(channel_id: int) -> list:
+  """Серверы, чат которых привязан к каналу дискорда"""
+  return [server_id for server_id, settings in config.CS_SERVERS.items()
+          if settings.get('chat_channel_id', config.CS_CHAT_CHNL_ID) == channel_id]
+
 # !SECTION
 
 # SECTION Events
 # -- get_status 
 @observer.subscribe(Event.BT_CS_Status)
 async def get_status():
-  if not cs_server.connected:
-    return
-  
-  try:
-    await cs_server.exec("ultrahc_ds_get_info")
-  except CommandExecutionError as err:
-    logger.error(f"CS Server: {err}")
-    await cs_server.disconnect()
-    await observer.notify(Event.CS_DISCONNECTED)
+  """
+    Опрашивает все подключенные серверы одновременно
+  """
+
+  async def poll(server_id: str, cs_server: CSRCON) -> None:
+    try:
+      await cs_server.exec("ultrahc_ds_get_info", CommandPriority.STATUS)
+    except CommandExecutionError as err:
+      logger.error(f"CS Server [{server_id}]: {err}")
+      await cs_server.disconnect()
+      await observer.notify(Event.CS_DISCONNECTED, {
+        "server_id": server_id,
+        "connected": servers.connected_ids()
+      })
+
+  await servers.fan_out(poll, servers.connected_ids())
 
 # -- on_ready connect
 @observer.subscribe(Event.BE_READY)
 @nsroute.create_route("/connect_to_cs")
 async def connect():
-  try:
-    await cs_server.connect_to_server()
-    logger.info(f"CS Server: Успешно подключен")
-    
-    await observer.notify(Event.CS_CONNECTED)
+  """
+    Подключается ко всем отключенным серверам одновременно
+  """
 
-  except CSConnectionError as err:
-    logger.error(f"CS Server: {err}")
+  async def connect_one(server_id: str, cs_server: CSRCON) -> None:
+    try:
+      await cs_server.connect_to_server()
+      logger.info(f"CS Server [{server_id}]: Успешно подключен")
+
+      await observer.notify(Event.CS_CONNECTED, {
+        "server_id": server_id,
+        "disconnected": servers.disconnected_ids()
+      })
+
+    except CSConnectionError as err:
+      logger.error(f"CS Server [{server_id}]: {err}")
+
+      # Запускает переподключение, если сервер недоступен уже при старте
+      await observer.notify(Event.CS_DISCONNECTED, {
+        "server_id": server_id,
+        "connected": servers.connected_ids()
+      })
+
+  await servers.fan_out(connect_one, servers.disconnected_ids())
 
 @observer.subscribe(Event.BE_MESSAGE)
-@require_connection
 async def send_message(data):
   message: discord.Message = data[Param.Message]
 
-  send_msg = "\"" + message.author.display_name + "\"" + " " + "\"" + message.content + "\""
+  send_msg = quote_arg(message.author.display_name) + " " + quote_arg(message.content)
   command = f"ultrahc_ds_send_msg {send_msg}"
 
-  try:
-    await cs_server.exec(command)
-  except CommandExecutionError as err:
-    logger.error(f"CS Server: {err}")
+  # Сообщение уходит на все серверы, привязанные к каналу;
+  # сообщения за короткое окно уходят одним RCON-пакетом
+  for server_id in chat_server_ids(message.channel.id):
+    if servers.get(server_id).connected:
+      chat_buffers[server_id].add(command)
+    else:
+      logger.error(f"CS Server [{server_id}]: Нет связи с CS")
 
 
 
@@ -75,21 +152,38 @@ async def send_message(data):
 # -- connect_to_cs
 @observer.subscribe(Event.BC_CONNECT_TO_CS)
 async def cmd_connect_to_cs(data):
-  await cs_server.disconnect()
   interaction: discord.Interaction = data[Param.Interaction]
+  server_id = servers.resolve(data.get('server_id'))
+
+  if server_id is None:
+    await interaction.followup.send(content="Такого сервера нет!", ephemeral=True)
+    return
+
+  cs_server = servers.get(server_id)
+  await cs_server.disconnect()
 
   try:
     await cs_server.connect_to_server()
-    logger.info(f"CS Server: Успешно подключен")
+    logger.info(f"CS Server [{server_id}]: Успешно подключен")
     await interaction.followup.send(content="Успешно подключено!", ephemeral=True)
+
+    await observer.notify(Event.CS_CONNECTED, {
+      "server_id": server_id,
+      "disconnected": servers.disconnected_ids()
+    })
   except CSConnectionError as err:
-    logger.error(f"CS Server: {err}")
+    logger.error(f"CS Server [{server_id}]: {err}")
     await interaction.followup.send(content="Невозможно подключиться!", ephemeral=True)
 
+    await observer.notify(Event.CS_DISCONNECTED, {
+      "server_id": server_id,
+      "connected": servers.connected_ids()
+    })
+
 # -- rcon
 @observer.subscribe(Event.BC_CS_RCON)
 @require_connection
-async def cmd_rcon(data):
+async def cmd_rcon(data, cs_server: CSRCON):
   interaction: discord.Interaction = data[Param.Interaction]
   command: str = data["command"]
   
@@ -104,7 +198,7 @@ async def cmd_rcon(data):
 # -- kick
 @observer.subscribe(Event.BC_CS_KICK)
 @require_connection
-async def cmd_kick(data):
+async def cmd_kick(data, cs_server: CSRCON):
   interaction: discord.Interaction = data[Param.Interaction]
   caller_name: str = interaction.user.display_name
   target: str = data['target']
@@ -126,7 +220,7 @@ async def cmd_kick(data):
 # -- ban
 @observer.subscribe(Event.BC_CS_BAN)
 @require_connection
-async def cmd_ban(data):
+async def cmd_ban(data, cs_server: CSRCON):
   interaction: discord.Interaction = data[Param.Interaction]
   caller_name: str = interaction.user.display_name
   target: str = data['target']
@@ -149,7 +243,7 @@ async def cmd_ban(data):
 # -- ban_offline
 @observer.subscribe(Event.BC_CS_BAN_OFFLINE)
 @require_connection
-async def cmd_ban_offline(data):
+async def cmd_ban_offline(data, cs_server: CSRCON):
   interaction: discord.Interaction = data[Param.Interaction]
   caller_name: str = interaction.user.display_name
   target: str = data['target']
@@ -172,7 +266,7 @@ async def cmd_ban_offline(data):
 # -- unban
 @observer.subscribe(Event.BC_CS_UNBAN)
 @require_connection
-async def cmd_unban(data):
+async def cmd_unban(data, cs_server: CSRCON):
   interaction: discord.Interaction = data[Param.Interaction]
   caller_name: str = interaction.user.display_name
   target: str = data['target']
@@ -193,7 +287,7 @@ async def cmd_unban(data):
 # -- sync_maps
 @observer.subscribe(Event.BC_CS_SYNC_MAPS)
 @require_connection
-async def cmd_sync_maps(data):
+async def cmd_sync_maps(data, cs_server: CSRCON):
   interaction: discord.Interaction = data[Param.Interaction]
   caller_name: str = interaction.user.display_name
 
@@ -211,7 +305,7 @@ async def cmd_sync_maps(data):
 # -- map_change
 @observer.subscribe(Event.BC_CS_MAP_CHANGE)
 @require_connection
-async def cmd_map_change(data):
+async def cmd_map_change(data, cs_server: CSRCON):
   interaction: discord.Interaction = data[Param.Interaction]
   caller_name: str = interaction.user.display_name
   mapname: str = data['map']
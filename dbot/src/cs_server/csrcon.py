@@ -1,6 +1,10 @@
-from rehlds.rcon import RCON
-from typing import Optional
-from enum import Enum
+from rehlds.rcon import AsyncRCON
+from observer.metrics import Histogram
+from typing import Any, Dict, List, Optional
+from enum import Enum, IntEnum
+import itertools
+import asyncio
+import time
 
 # SECTION Исключения CSServer
 
@@ -34,40 +38,171 @@ class CommandExecutionError(CSServerError):
 class DefaultCommands(Enum):
     GET_STATUS = "ultrahc_ds_get_info"
 
+class CommandPriority(IntEnum):
+  """Приоритет команды в очереди: меньше - раньше."""
+  ADMIN = 0
+  CHAT = 1
+  STATUS = 2
+
+# -- _is_timeout()
+def _is_timeout(error: BaseException) -> bool:
+  """AsyncRCON оборачивает таймаут в ServerOffline, поэтому ищем его в цепочке исключений."""
+  while error is not None:
+    if isinstance(error, asyncio.TimeoutError):
+      return True
+    error = error.__cause__ or error.__context__
+  return False
+
 # SECTION Class CSRCON
 class CSRCON:
   # -- __init__()
-  def __init__(self, host: str, password: str) -> None:
+  def __init__(self, host: str, password: str, max_in_flight: int = 1, port: int = 27015) -> None:
     """
     Инициализирует экземпляр CSServer.
 
+    Команды проходят через очередь с приоритетами. Одновременно ждать ответа
+    могут max_in_flight команд: у каждой такой "полосы" свое UDP-соединение,
+    поэтому ответы однозначно сопоставляются с запросами.
+
     :param host: Адрес сервера.
     :param password: Пароль для подключения к серверу.
+    :param max_in_flight: Сколько команд может одновременно ждать ответа.
+    :param port: Порт сервера.
     """
-    self.cs_server: RCON = RCON(host=host, password=password)
+    self.max_in_flight: int = max(1, max_in_flight)
+    self.connections: List[AsyncRCON] = [AsyncRCON(host=host, port=port, password=password) for _ in range(self.max_in_flight)]
+    self.cs_server: AsyncRCON = self.connections[0]
     self.connected: bool = False
 
+    self._queue: Optional[asyncio.PriorityQueue] = None
+    self._workers: List[asyncio.Task] = []
+    self._sequence = itertools.count()
+
+    # Статистика для мониторинга
+    self.in_flight: int = 0
+    self.executed: int = 0
+    self.wait_time_last: float = 0.0
+    self.wait_time_max: float = 0.0
+    self._wait_time_total: float = 0.0
+    # Время от отправки команды до полного ответа (без ожидания в очереди)
+    self.rtt: Histogram = Histogram()
+    self.timeouts: int = 0
+    self._pending: Dict[CommandPriority, int] = {priority: 0 for priority in CommandPriority}
+
   # -- connect_to_server()
   async def connect_to_server(self) -> None:
     """
-    Подключается к серверу CS и возвращает статус.
+    Подключается к серверу CS и запускает обработчики очереди команд.
     
     :raises ConnectionError: Если не удалось подключиться к серверу.
     """
     try:
-      self.cs_server.connect()
-      self.connected = True
+      await asyncio.gather(*(connection.connect() for connection in self.connections))
     except Exception as e:
+      for connection in self.connections:
+        connection.disconnect()
       raise ConnectionError(f"Ошибка подключения: {str(e)}")
+
+    self._queue = asyncio.PriorityQueue()
+    self._workers = [asyncio.create_task(self._worker(connection)) for connection in self.connections]
+    self.connected = True
     
   # -- disconnect()
   async def disconnect(self) -> None:
     """
-    Отключается от сервера кс
+    Отключается от сервера кс, команды из очереди завершаются с ошибкой
     """
-    self.cs_server.disconnect()
     self.connected = False
 
+    for worker in self._workers:
+      worker.cancel()
+    self._workers = []
+
+    if self._queue:
+      while not self._queue.empty():
+        _, _, _, _, future = self._queue.get_nowait()
+        if not future.done():
+          future.set_exception(CommandExecutionError("Ошибка выполнения команды: соединение с сервером закрыто"))
+      self._queue = None
+    self._pending = {priority: 0 for priority in CommandPriority}
+
+    for connection in self.connections:
+      connection.disconnect()
+
+  # -- _worker()
+  async def _worker(self, connection: AsyncRCON) -> None:
+    """
+    Забирает команды из очереди и выполняет их через свое соединение.
+
+    :param connection: Соединение, закрепленное за обработчиком.
+    """
+    queue = self._queue
+
+    while True:
+      priority, _, enqueued_at, command, future = await queue.get()
+      self._pending[priority] -= 1
+
+      if future.done():
+        continue
+
+      wait_time = time.monotonic() - enqueued_at
+      self.wait_time_last = wait_time
+      self.wait_time_max = max(self.wait_time_max, wait_time)
+      self._wait_time_total += wait_time
+
+      self.in_flight += 1
+      started = time.monotonic()
+      try:
+        # AsyncRCON закрывается после ошибки, переподключаем лениво
+        if not connection.connected:
+          await connection.connect()
+        result = await connection.execute(command)
+        self.rtt.observe(time.monotonic() - started)
+        if not future.done():
+          future.set_result(result)
+      except asyncio.CancelledError:
+        # disconnect() отменяет обработчики: текущая команда тоже завершается ошибкой, иначе exec() ждет вечно
+        if not future.done():
+          future.set_exception(CommandExecutionError("Ошибка выполнения команды: соединение с сервером закрыто"))
+        raise
+      except Exception as e:
+        self.rtt.observe(time.monotonic() - started, error=True)
+        if _is_timeout(e):
+          self.timeouts += 1
+        if not future.done():
+          future.set_exception(CommandExecutionError(f"Ошибка выполнения команды: {str(e)}"))
+      finally:
+        self.in_flight -= 1
+        self.executed += 1
+
+  # -- queue_depth
+  @property
+  def queue_depth(self) -> int:
+    """Количество команд, ожидающих отправки."""
+    return self._queue.qsize() if self._queue else 0
+
+  # -- stats()
+  def stats(self) -> Dict[str, Any]:
+    """
+    Возвращает состояние очереди команд для мониторинга.
+
+    :return: Глубина очереди (всего и по приоритетам), команды в полете и время ожидания в очереди.
+    """
+    return {
+      "queue_depth": self.queue_depth,
+      "pending": {priority.name: count for priority, count in self._pending.items()},
+      "in_flight": self.in_flight,
+      "max_in_flight": self.max_in_flight,
+      "executed": self.executed,
+      "wait_time_last": self.wait_time_last,
+      "wait_time_avg": self._wait_time_total / self.executed if self.executed else 0.0,
+      "wait_time_max": self.wait_time_max,
+      "rtt_p50": self.rtt.percentile(0.50),
+      "rtt_p95": self.rtt.percentile(0.95),
+      "rtt_p99": self.rtt.percentile(0.99),
+      "timeouts": self.timeouts,
+    }
+
   # -- fetch_status()
   async def fetch_status(self) -> None:
     """
@@ -78,21 +213,26 @@ class CSRCON:
     """
 
     try:
-      self.cs_server.execute(DefaultCommands.GET_STATUS.value)
+      await self.exec(DefaultCommands.GET_STATUS.value, CommandPriority.STATUS)
     except Exception as e:
       raise StatusError(f"Ошибка получения статуса: {str(e)}")
 
   # -- exec()
-  async def exec(self, command: str) -> str:
+  async def exec(self, command: str, priority: CommandPriority = CommandPriority.ADMIN) -> str:
     """
-    Выполняет команду на сервере.
+    Ставит команду в очередь и ждет результат выполнения.
 
     :param command: Команда для выполнения.
+    :param priority: Приоритет команды (админские команды идут раньше чата, чат раньше статуса).
     :raises CommandExecutionError: Если произошла ошибка при выполнении команды.
     """
-    try:
-      return self.cs_server.execute(command)
-    except Exception as e:
-      raise CommandExecutionError(f"Ошибка выполнения команды: {str(e)}")
+    if not self._queue:
+      raise CommandExecutionError("Ошибка выполнения команды: нет подключения к серверу")
+
+    future: asyncio.Future = asyncio.get_running_loop().create_future()
+    self._queue.put_nowait((priority, next(self._sequence), time.monotonic(), command, future))
+    self._pending[priority] += 1
+
+    return await future
 
 # !SECTION
@@ -0,0 +1,83 @@
+from cs_server.csrcon import CSRCON
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+
+# SECTION Class ServerRegistry
+class ServerRegistry:
+  # -- __init__()
+  def __init__(self) -> None:
+    """
+    Реестр CS-серверов одного процесса бота.
+
+    Первый добавленный сервер считается сервером по умолчанию: к нему идут
+    вебхуки и команды без server_id.
+    """
+    self._servers: Dict[str, CSRCON] = {}
+    self.default_id: Optional[str] = None
+
+  # -- add()
+  def add(self, server_id: str, server: CSRCON) -> None:
+    """
+    Добавляет сервер в реестр.
+
+    :param server_id: Идентификатор сервера.
+    :param server: Подключение к серверу.
+    """
+    self._servers[server_id] = server
+    if self.default_id is None:
+      self.default_id = server_id
+
+  # -- resolve()
+  def resolve(self, server_id: Optional[str]) -> Optional[str]:
+    """
+    Возвращает server_id, подставляя сервер по умолчанию для пустого значения.
+
+    :param server_id: Идентификатор сервера или None.
+    :return: Идентификатор зарегистрированного сервера или None, если такого нет.
+    """
+    if not server_id:
+      return self.default_id
+    return server_id if server_id in self._servers else None
+
+  # -- get()
+  def get(self, server_id: Optional[str] = None) -> Optional[CSRCON]:
+    """
+    Возвращает сервер по идентификатору.
+
+    :param server_id: Идентификатор сервера (None - сервер по умолчанию).
+    """
+    resolved = self.resolve(server_id)
+    return self._servers.get(resolved) if resolved else None
+
+  # -- ids()
+  def ids(self) -> List[str]:
+    """Идентификаторы всех серверов."""
+    return list(self._servers)
+
+  # -- connected_ids()
+  def connected_ids(self) -> List[str]:
+    """Идентификаторы подключенных серверов."""
+    return [server_id for server_id, server in self._servers.items() if server.connected]
+
+  # -- disconnected_ids()
+  def disconnected_ids(self) -> List[str]:
+    """Идентификаторы отключенных серверов."""
+    return [server_id for server_id, server in self._servers.items() if not server.connected]
+
+  # -- fan_out()
+  async def fan_out(self, func: Callable[[str, CSRCON], Awaitable[Any]], server_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Выполняет func для нескольких серверов одновременно.
+
+    :param func: Корутина вида func(server_id, server).
+    :param server_ids: Для каких серверов выполнять (по умолчанию - для всех).
+    :return: Результат или исключение для каждого server_id.
+    """
+    if server_ids is None:
+      server_ids = self.ids()
+
+    results = await asyncio.gather(*(func(server_id, self._servers[server_id]) for server_id in server_ids),
+                                   return_exceptions=True)
+    return dict(zip(server_ids, results))
+
+# !SECTION
@@ -1,5 +1,11 @@
 import aiomysql
-from typing import AsyncIterator, List, Tuple, Any, Optional
+from pymysql.constants import CLIENT
+from pymysql.constants.ER import DUP_ENTRY as ER_DUP_ENTRY
+from observer.metrics import Histogram
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Tuple, Any, Optional
+import asyncio
+import time
 
 # SECTION AioMysqlError
 class AioMysqlError(Exception):
@@ -16,6 +22,11 @@ class QueryError(AioMysqlError):
   """Исключение для ошибок выполнения SQL-запросов."""
   pass
 
+# -- DuplicateKeyError
+class DuplicateKeyError(QueryError):
+  """Исключение, когда запись нарушает уникальный ключ (ошибка MySQL 1062)."""
+  pass
+
 # -- MultipleQueryError
 class MultipleQueryError(AioMysqlError):
   """Исключение для ошибок выполнения нескольких SQL-запросов."""
@@ -31,15 +42,35 @@ class TransactionError(AioMysqlError):
 # SECTION AioMysql
 class AioMysql:
   # -- __init__()
-  def __init__(self, host: str, port: int, user: str, password: str, db: str) -> None:
+  def __init__(self, host: str, port: int, user: str, password: str, db: str,
+               minsize: int = 1, maxsize: int = 10, pool_recycle: int = -1,
+               connect_timeout: float = 60, autocommit: bool = False, found_rows: bool = False) -> None:
+    """Инициализация клиента MySQL.
+
+    :param minsize: Сколько соединений пул держит открытыми всегда.
+    :param maxsize: Предел соединений. Если все заняты, запрос ждет свободное.
+    :param pool_recycle: Соединение старше (сек) пересоздается при выдаче из пула, -1 - никогда.
+    :param connect_timeout: Таймаут подключения (сек).
+    :param autocommit: Режим автокоммита соединений.
+    :param found_rows: UPDATE возвращает число найденных строк, а не измененных (флаг CLIENT.FOUND_ROWS).
+    """
     self.host: str = host
     self.port: int = port
     self.user: str = user
     self.password: str = password
     self.db: str = db
+    self.minsize: int = minsize
+    self.maxsize: int = maxsize
+    self.pool_recycle: int = pool_recycle
+    self.connect_timeout: float = connect_timeout
+    self.autocommit: bool = autocommit
+    self.found_rows: bool = found_rows
     self.pool: Optional[aiomysql.Pool] = None
     self.conn: Optional[aiomysql.Connection] = None
 
+    # Время ожидания свободного соединения в пуле
+    self.acquire_wait: Histogram = Histogram()
+
   # -- connect()
   async def connect(self) -> None:
     """Создает пул соединений с базой данных."""
@@ -49,10 +80,50 @@ class AioMysql:
         port=self.port,
         user=self.user,
         password=self.password,
-        db=self.db
+        db=self.db,
+        minsize=self.minsize,
+        maxsize=self.maxsize,
+        pool_recycle=self.pool_recycle,
+        connect_timeout=self.connect_timeout,
+        autocommit=self.autocommit,
+        client_flag=CLIENT.FOUND_ROWS if self.found_rows else 0
       )
     except aiomysql.Error as e:
       raise ConnectionError(f"Ошибка при подключении к базе данных: {e}")
+
+  # -- warm_up()
+  async def warm_up(self) -> int:
+    """Открывает minsize соединений и проверяет каждое (ping), чтобы первые запросы не ждали подключения.
+    Возвращает число свободных соединений в пуле."""
+    conns = []
+    try:
+      for _ in range(max(self.minsize, 1)):
+        conns.append(await self.pool.acquire())
+      await asyncio.gather(*(conn.ping() for conn in conns))
+    except (aiomysql.Error, OSError, asyncio.TimeoutError) as e:
+      raise ConnectionError(f"Ошибка при подготовке соединений: {e}")
+    finally:
+      for conn in conns:
+        await self.pool.release(conn)
+
+    return self.pool.freesize
+
+  # -- _acquire()
+  @asynccontextmanager
+  async def _acquire(self) -> AsyncIterator[aiomysql.Connection]:
+    """Соединение из пула с замером времени ожидания."""
+    started = time.monotonic()
+    try:
+      conn = await self.pool.acquire()
+    except BaseException:
+      self.acquire_wait.observe(time.monotonic() - started, error=True)
+      raise
+    self.acquire_wait.observe(time.monotonic() - started)
+
+    try:
+      yield conn
+    finally:
+      await self.pool.release(conn)
     
   def is_connected(self) -> bool:
     """Проверяет, открыт ли пул соединений."""
@@ -62,7 +133,7 @@ class AioMysql:
   async def execute_one(self, query: str, args: Optional[Tuple[Any, ...]] = ()) -> Tuple[int, Optional[List[Tuple[Any, ...]]]]:
     """Выполняет SQL-запрос и возвращает количество затронутых строк и результат."""
     try:
-      async with self.pool.acquire() as conn:
+      async with self._acquire() as conn:
         async with conn.cursor() as cursor:
           await cursor.execute(query, args)
           affected_rows = cursor.rowcount  # Получаем количество затронутых строк
@@ -82,12 +153,16 @@ class AioMysql:
   async def execute_change(self, query: str, args: Optional[Tuple[Any, ...]] = ()) -> int:
     """Выполняет SQL-запрос, изменяющий данные, и возвращает количество затронутых строк."""
     try:
-      async with self.pool.acquire() as conn:
+      async with self._acquire() as conn:
         async with conn.cursor() as cursor:
           await cursor.execute(query, args)
           affected_rows = cursor.rowcount
           await conn.commit()  # Коммитим изменения
           return affected_rows
+    except aiomysql.IntegrityError as e:
+      if e.args and e.args[0] == ER_DUP_ENTRY:
+        raise DuplicateKeyError(f"Дубликат уникального ключа: {e}. Запрос: {query}, Параметры: {args}")
+      raise QueryError(f"Ошибка при выполнении запроса: {e}. Запрос: {query}, Параметры: {args}")
     except aiomysql.Error as e:
       raise QueryError(f"Ошибка при выполнении запроса: {e}. Запрос: {query}, Параметры: {args}")
     except Exception as e:
@@ -97,7 +172,7 @@ class AioMysql:
   async def execute_select(self, query: str, args: Optional[Tuple[Any, ...]] = ()) -> List[Tuple[Any, ...]]:
     """Выполняет SQL-запрос на выборку данных и возвращает результат."""
     try:
-      async with self.pool.acquire() as conn:
+      async with self._acquire() as conn:
         async with conn.cursor() as cursor:
           await cursor.execute(query, args)
           result = await cursor.fetchall()  # Получаем результат
@@ -112,7 +187,7 @@ class AioMysql:
   async def exec_many(self, query: str, args_list: List[Tuple[Any, ...]]) -> None:
     """Выполняет один и тот же SQL-запрос несколько раз с разными наборами параметров."""
     try:
-      async with self.pool.acquire() as conn:
+      async with self._acquire() as conn:
         async with conn.cursor() as cursor:
           await cursor.executemany(query, args_list)
           await conn.commit()
@@ -125,7 +200,7 @@ class AioMysql:
   async def fetch_iter(self, query: str, *, args: Optional[Tuple[Any, ...]] = (), batch_size: int = 100) -> AsyncIterator[Tuple[Any, ...]]:
     """Асинхронный итератор для выборки данных по частям."""
     try:
-      async with self.pool.acquire() as conn:
+      async with self._acquire() as conn:
         async with conn.cursor() as cursor:
           await cursor.execute(query, args)
           while True:
@@ -139,6 +214,19 @@ class AioMysql:
     except Exception as e:
       raise QueryError(f"Неожиданная ошибка: {e}. Запрос: {query}, Параметры: {args}")
 
+  # -- pool_stats()
+  def pool_stats(self) -> Dict[str, int]:
+    """Использование пула соединений: открыто, занято, свободно и предел."""
+    if not self.pool:
+      return {}
+
+    return {
+      "size": self.pool.size,
+      "in_use": self.pool.size - self.pool.freesize,
+      "free": self.pool.freesize,
+      "max": self.pool.maxsize,
+    }
+
   # -- close()
   async def close(self) -> None:
     """Закрывает пул соединений."""
@@ -1,5 +1,6 @@
 from redis import asyncio as aioredis
-from typing import Optional, Union, List
+from typing import Dict, Optional, Union, List
+import asyncio
 
 # SECTION RedisError
 class RedisError(Exception):
@@ -39,114 +40,145 @@ class RedisKeysError(RedisError):
 # SECTION Class AsyncRedisClient
 class AsyncRedisClient:
   # -- __init__()
-  def __init__(self, host: str = '127.0.0.1', port: int = 6379, db: int = 0) -> None:
-    """Инициализация клиента Redis."""
+  def __init__(self, host: str = '127.0.0.1', port: int = 6379, db: int = 0, max_connections: int = 16,
+               health_check_interval: int = 30, socket_timeout: float = 5, socket_connect_timeout: float = 5) -> None:
+    """Инициализация клиента Redis.
+
+    :param max_connections: Размер пула. Если все соединения заняты, запрос ждет свободное до socket_timeout.
+    :param health_check_interval: Соединение, простоявшее дольше (сек), проверяется PING перед использованием.
+    :param socket_timeout: Таймаут ответа Redis (сек).
+    :param socket_connect_timeout: Таймаут подключения (сек).
+    """
     self.host: str = host
     self.port: int = port
     self.db: int = db
-    self.pool = None
+    self.max_connections: int = max_connections
+    self.health_check_interval: int = health_check_interval
+    self.socket_timeout: float = socket_timeout
+    self.socket_connect_timeout: float = socket_connect_timeout
+
+    self.pool: Optional[aioredis.BlockingConnectionPool] = None
+    self.client: Optional[aioredis.Redis] = None
 
     self.connected: bool = False
 
   # -- connect()
   async def connect(self) -> None:
-    """Подключение к Redis с использованием пула соединений."""
+    """Подключение к Redis: один клиент на весь процесс поверх пула соединений.
+    Повторный вызов (переподключение) закрывает прежний клиент и пул."""
+    if self.client:
+      await self.close()
+
     try:
-      self.pool = aioredis.ConnectionPool.from_url(f"redis://{self.host}:{self.port}/{self.db}")
+      self.pool = aioredis.BlockingConnectionPool(host=self.host,
+                                                  port=self.port,
+                                                  db=self.db,
+                                                  max_connections=self.max_connections,
+                                                  timeout=self.socket_timeout,
+                                                  health_check_interval=self.health_check_interval,
+                                                  socket_timeout=self.socket_timeout,
+                                                  socket_connect_timeout=self.socket_connect_timeout)
+      self.client = aioredis.Redis(connection_pool=self.pool)
 
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        await conn.ping()
-        self.connected = True
+      await self.client.ping()
+      self.connected = True
     except aioredis.RedisError as e:
       self.connected = False
       raise RedisConnectionError(f"Ошибка подключения к Redis: {e}")
 
   # -- is_connected()
   async def is_connected(self) -> bool:
-    """Проверяет, подключен ли клиент к Redis."""
-    if not self.pool or not self.connected:
+    """Проверяет соединение командой PING и обновляет connected."""
+    if not self.client or not self.connected:
       return False
 
     try:
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        await conn.ping()
-        return True
+      await self.client.ping()
+      return True
     except aioredis.RedisError:
+      self.connected = False
       return False
 
+  # -- handle_error()
+  def handle_error(self, error: BaseException) -> bool:
+    """Пассивная проверка здоровья: ошибка соединения или таймаут помечают клиент отключенным.
+
+    :param error: Исключение, возникшее при выполнении команды (в том числе обернутое в RedisError).
+    :return: True, если ошибка связана с соединением.
+    """
+    while error is not None:
+      if isinstance(error, (aioredis.ConnectionError, aioredis.TimeoutError, OSError, asyncio.TimeoutError)):
+        self.connected = False
+        return True
+      error = error.__cause__ or error.__context__
+    return False
+
 
   # -- set_hash()
   async def set_hash(self, table: str, key: str, value: Union[str, bytes]) -> None:
     """Устанавливает значение в хэш (таблицу) по ключу."""
-    if not self.pool:
+    if not self.client:
       raise RedisConnectionError("Клиент Redis не инициализирован.")
 
     try:
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        await conn.hset(table, key, value)
+      await self.client.hset(table, key, value)
     except aioredis.RedisError as e:
       raise RedisSetError(f"Ошибка при установке значения в таблицу '{table}': {e}")
 
   # -- get_hash()
   async def get_hash(self, table: str, key: str) -> Optional[Union[str, bytes]]:
     """Получает значение из хэша (таблицы) по ключу."""
-    if not self.pool:
+    if not self.client:
       raise RedisConnectionError("Клиент Redis не инициализирован.")
 
     try:
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        value = await conn.hget(table, key)
-        return None if value is None else value.decode('utf-8')  # Декодируем значение, если оно не None
+      value = await self.client.hget(table, key)
+      return None if value is None else value.decode('utf-8')  # Декодируем значение, если оно не None
     except aioredis.RedisError as e:
       raise RedisGetError(f"Ошибка при получении значения из таблицы '{table}': {e}")
 
   # -- delete_hash()
   async def delete_hash(self, table: str, key: str) -> int:
     """Удаляет ключ из хэша (таблицы)."""
-    if not self.pool:
+    if not self.client:
       raise RedisConnectionError("Клиент Redis не инициализирован.")
 
     try:
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        return await conn.hdel(table, key)
+      return await self.client.hdel(table, key)
     except aioredis.RedisError as e:
       raise RedisDeleteError(f"Ошибка при удалении ключа из таблицы '{table}': {e}")
 
   # -- exists_hash()
   async def exists_hash(self, table: str, key: str) -> bool:
     """Проверяет, существует ли ключ в хэше (таблице)."""
-    if not self.pool:
+    if not self.client:
       raise RedisConnectionError("Клиент Redis не инициализирован.")
 
     try:
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        return await conn.hexists(table, key)
+      return await self.client.hexists(table, key)
     except aioredis.RedisError as err:
       raise RedisExistsError(f"Ошибка при проверке существования ключа в таблице '{table}': {err}")
 
   # -- keys_hash()
   async def keys_hash(self, table: str) -> List[str]:
     """Возвращает список всех ключей в хэше (таблице)."""
-    if not self.pool:
+    if not self.client:
       raise RedisConnectionError("Клиент Redis не инициализирован.")
 
     try:
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        return await conn.hkeys(table)
+      return await self.client.hkeys(table)
     except aioredis.RedisError as e:
       raise RedisKeysError(f"Ошибка при получении ключей из таблицы '{table}': {e}")
 
   # -- list_add()
   async def list_add(self, table: str, value: str) -> None:
     """Добавляет значение в конец списка, связанного с таблицей."""
-    async with aioredis.Redis.from_pool(self.pool) as conn:
-      await conn.rpush(table, value)
+    await self.client.rpush(table, value)
 
   # -- list_get()
   async def list_get(self, table: str, from_: int, to_: int=-1) -> List[str]:
     """Возвращает последние n значений из списка, связанного с таблицей."""
-    async with aioredis.Redis.from_pool(self.pool) as conn:
-      return await conn.lrange(table, from_, to_)  # Получаем последние n значений
+    return await self.client.lrange(table, from_, to_)  # Получаем последние n значений
     
   # -- list_delete()
   async def list_delete(self, table: str, value: str, count: int = 0) -> None:
@@ -159,18 +191,16 @@ class AsyncRedisClient:
                   Если count < 0, удаляет только последние count вхождений.
                   Если count = 0, удаляет все вхождения.
     """
-    async with aioredis.Redis.from_pool(self.pool) as conn:
-      await conn.lrem(table, count, value)
+    await self.client.lrem(table, count, value)
 
   #  -- list_clear()
   async def list_clear(self, table: str) -> None:
     """Очищает содержимое списка, оставляя сам ключ."""
-    if not self.pool:
+    if not self.client:
       raise RedisConnectionError("Клиент Redis не инициализирован.")
 
     try:
-      async with aioredis.Redis.from_pool(self.pool) as conn:
-        await conn.ltrim(table, 1, 0) 
+      await self.client.ltrim(table, 1, 0) 
     except aioredis.RedisError as e:
       raise RedisError(f"Ошибка при очистке списка '{table}': {e}")
 
@@ -178,16 +208,97 @@ class AsyncRedisClient:
   # -- list_exists()
   async def list_exists(self, table: str, value: str) -> bool:
     """Проверяет, существует ли значение в списке, связанном с таблицей."""
-    async with aioredis.Redis.from_pool(self.pool) as conn:
-      list_values = await conn.lrange(table, 0, -1)
-      return value.encode('utf-8') in list_values
+    list_values = await self.client.lrange(table, 0, -1)
+    return value.encode('utf-8') in list_values
+
+
+  # -- zset_add()
+  async def zset_add(self, table: str, mapping: Dict[str, float]) -> None:
+    """Добавляет значения в сортированное множество или обновляет их счет (например, время)."""
+    if mapping:
+      await self.client.zadd(table, mapping)
+
+  # -- zset_get()
+  async def zset_get(self, table: str, start: int = 0, end: int = -1, desc: bool = True) -> List[bytes]:
+    """Возвращает значения сортированного множества по позициям, по умолчанию от большего счета к меньшему."""
+    return await self.client.zrange(table, start, end, desc=desc)
+
+  # -- zset_delete()
+  async def zset_delete(self, table: str, value: str) -> int:
+    """Удаляет значение из сортированного множества."""
+    return await self.client.zrem(table, value)
+
+  # -- zset_exists()
+  async def zset_exists(self, table: str, value: str) -> bool:
+    """Проверяет, есть ли значение в сортированном множестве."""
+    return await self.client.zscore(table, value) is not None
+
+  # -- set_add()
+  async def set_add(self, table: str, *values: str) -> None:
+    """Добавляет значения в множество."""
+    if values:
+      await self.client.sadd(table, *values)
+
+  # -- set_get()
+  async def set_get(self, table: str) -> List[bytes]:
+    """Возвращает все значения множества (без порядка)."""
+    return list(await self.client.smembers(table))
+
+  # -- set_delete()
+  async def set_delete(self, table: str, *values: str) -> int:
+    """Удаляет значения из множества."""
+    return await self.client.srem(table, *values)
+
+  # -- set_exists()
+  async def set_exists(self, table: str, value: str) -> bool:
+    """Проверяет, есть ли значение в множестве."""
+    return bool(await self.client.sismember(table, value))
+
+  # -- key_type()
+  async def key_type(self, table: str) -> str:
+    """Тип ключа в Redis: 'list', 'set', 'zset', 'hash', 'string' или 'none'."""
+    key_type = await self.client.type(table)
+    return key_type.decode('utf-8') if isinstance(key_type, bytes) else key_type
+
+  # -- publish()
+  async def publish(self, channel: str, message: str) -> int:
+    """Публикует сообщение в канал pub/sub.
+
+    :return: Сколько подписчиков получили сообщение.
+    """
+    return await self.client.publish(channel, message)
+
+  # -- pubsub()
+  def pubsub(self) -> aioredis.client.PubSub:
+    """Объект подписки. Занимает отдельное соединение пула, пока открыт."""
+    if not self.client:
+      raise RedisConnectionError("Клиент Redis не инициализирован.")
+
+    return self.client.pubsub(ignore_subscribe_messages=True)
+
+  # -- pool_stats()
+  def pool_stats(self) -> Dict[str, int]:
+    """Использование пула соединений: создано, занято, свободно и предел."""
+    if not self.pool:
+      return {}
+
+    in_use = len(self.pool._in_use_connections)
+    available = len(self.pool._available_connections)
 
+    return {
+      "created": in_use + available,
+      "in_use": in_use,
+      "available": available,
+      "max": self.pool.max_connections,
+    }
 
   # -- close()
   async def close(self) -> None:
-    """Закрывает соединение с Redis."""
-    if self.pool:
-      await self.pool.disconnect()
+    """Закрывает клиент и все соединения пула."""
+    if self.client:
+      await self.client.aclose(close_connection_pool=True)
+      self.client = None
+      self.pool = None
       self.connected = False
       
 # !SECTION
@@ -1,47 +1,95 @@
-from observer.observer_client import observer, Event, logger, nsroute
-from data_server.redis_client import AsyncRedisClient as AsyncRC
+from observer.observer_client import observer, Event, logger, nsroute, metrics
+from data_server.redis_client import AsyncRedisClient as AsyncRC, RedisError
 
 import config
 from cachetools import TTLCache
-
 from redis import asyncio as aioredis
 
+import asyncio
+import json
+import time
+import uuid
+
 from typing import Dict
 
 class RedisTable:
   MapListActive = "map_list_active"
-  """Хранит активные карты"""
+  """Хранит активные карты (множество)"""
 
   MapListAll = "map_list_all"
-  """Хранит все карты"""
+  """Хранит все карты (множество)"""
 
   LastPlayers = "last_players"
-  """Хранит всех игроков ранее заходившие"""
+  """Хранит всех игроков ранее заходившие (сортированное множество, счет - время последнего появления)"""
 
   BannedPlayers = "banned_players"
-  """Хранит всех забаненных игроков"""
+  """Хранит всех забаненных игроков (сортированное множество, счет - время бана)"""
+
+  SteamToDiscord = "steam_discord"
+  """Хэш steam_id -> discord_id зарегистрированных игроков (копия users из MySQL)"""
+
+  DiscordToSteam = "discord_steam"
+  """Обратный хэш discord_id -> steam_id, нужен для /unreg"""
+
+  MessageAnchors = "message_anchors"
+  """Хранит id сообщений статуса и чата в дискорде, чтобы после перезапуска продолжить их править"""
 
 # -- init
 rc: AsyncRC = AsyncRC(host=config.REDIS_HOST,
-                              port=config.REDIS_PORT)
+                      port=config.REDIS_PORT,
+                      max_connections=config.REDIS_MAX_CONNECTIONS,
+                      health_check_interval=config.REDIS_HEALTH_CHECK_INTERVAL,
+                      socket_timeout=config.REDIS_SOCKET_TIMEOUT,
+                      socket_connect_timeout=config.REDIS_SOCKET_CONNECT_TIMEOUT)
+
+# steam_id -> discord_id в памяти процесса, и отдельно steam_id без привязки (живут меньше)
+cache_players: TTLCache = TTLCache(maxsize=config.STEAM_CACHE_SIZE, ttl=config.STEAM_CACHE_TTL)
+cache_players_missing: TTLCache = TTLCache(maxsize=config.STEAM_CACHE_SIZE, ttl=config.STEAM_CACHE_MISS_TTL)
+
+# Хэш SteamToDiscord заполнен из MySQL: промах в Redis значит, что привязки нет
+steam_links_loaded: bool = False
+
+# Проверка соединения и переподключение, см. redis_heartbeat
+heartbeat_task: asyncio.Task = None
 
-cache_players: TTLCache = TTLCache(maxsize=32, ttl=120)
+# Подписка на изменения от других экземпляров бота, см. listen_invalidations
+invalidation_task: asyncio.Task = None
+
+# Метка процесса в сообщениях канала инвалидации, свои сообщения пропускаем
+instance_id: str = uuid.uuid4().hex
+
+metrics.register_gauge("dbot_redis_pool_connections", "Соединения в пуле Redis", rc.pool_stats, label="state")
 
 # SECTION
 
 def require_connection(func) -> callable:
+  """
+    Пропускает вызов, если Redis отключен (проверка флага, без PING)
+    Ошибка соединения помечает Redis отключенным до переподключения в redis_heartbeat
+  """
   
   async def wrapper(*args, **kwargs) -> callable:
     if not rc.connected:
       return None
-    
-    if not (await rc.is_connected()):
-      return None
 
-    return await func(*args, **kwargs)
+    try:
+      return await func(*args, **kwargs)
+    except (RedisError, aioredis.RedisError) as err:
+      if rc.handle_error(err):
+        on_disconnect()
+      logger.error(f"Redis: {err}")
+      return None
   
   return wrapper
 
+# -- on_disconnect
+def on_disconnect() -> None:
+  global steam_links_loaded
+
+  # Redis мог перезапуститься пустым - до новой загрузки из SQL промах в хэше ничего не значит
+  steam_links_loaded = False
+  logger.error("Redis: Соединение потеряно")
+
 # !SECTION
 
 # -- run_rc
@@ -53,6 +101,225 @@ async def run_rc():
   except Exception as err:
     logger.error(err)
 
+  # Индексы загружает listen_invalidations после подписки (см. resync_local_caches)
+  global heartbeat_task, invalidation_task
+  if heartbeat_task is None:
+    heartbeat_task = asyncio.create_task(redis_heartbeat())
+  if invalidation_task is None:
+    invalidation_task = asyncio.create_task(listen_invalidations())
+
+# -- redis_heartbeat
+async def redis_heartbeat():
+  """
+    Раз в REDIS_HEARTBEAT_INTERVAL проверяет соединение (PING)
+    Если Redis отключен, переподключается с экспоненциальной задержкой до REDIS_RECONNECT_MAX_DELAY
+  """
+  delay = config.REDIS_HEARTBEAT_INTERVAL
+  backoff = 1
+
+  while True:
+    await asyncio.sleep(delay)
+
+    if rc.connected:
+      if await rc.is_connected():
+        continue
+      on_disconnect()
+
+    try:
+      await rc.connect()
+    except Exception as err:
+      delay = backoff
+      backoff = min(backoff * 2, config.REDIS_RECONNECT_MAX_DELAY)
+      logger.error(f"{err}. Следующая попытка через {delay} с")
+      continue
+
+    delay = config.REDIS_HEARTBEAT_INTERVAL
+    backoff = 1
+    logger.info(f"Redis: Переподключен к {rc.host}:{rc.port}")
+
+    # Привязки SteamID могли пропасть вместе с данными Redis - загружаем заново
+    links = await nsroute.call_route("/get_steam_links")
+    if links is not None:
+      await route_load_steam_links(links)
+
+# -- migrate_lists
+@require_connection
+async def migrate_lists():
+  """
+    Разовая миграция со старого формата, где игроки, баны и карты хранились в списках
+    Игроки и баны -> сортированные множества (порядок списка сохраняется в счете), карты -> множества
+  """
+  now = time.time()
+
+  for table in (RedisTable.LastPlayers, RedisTable.BannedPlayers, RedisTable.MapListAll, RedisTable.MapListActive):
+    if await rc.key_type(table) != 'list':
+      continue
+
+    values = [value.decode('utf-8') for value in await rc.list_get(table, 0)]
+
+    async with rc.client.pipeline(transaction=True) as pipe:
+      pipe.delete(table)
+      if values and table in (RedisTable.LastPlayers, RedisTable.BannedPlayers):
+        # В конце списка - самые свежие. Повторы схлопываются в последнее вхождение
+        pipe.zadd(table, {value: now - (len(values) - index) for index, value in enumerate(values)})
+      elif values:
+        pipe.sadd(table, *values)
+
+      await pipe.execute()
+
+    logger.info(f"Redis: {table} перенесен из списка, записей: {len(values)}")
+
+# -- publish_index
+async def publish_index(table: str, added: Dict[str, float] = None, removed: list = None, reset: bool = False):
+  """
+    Сообщает локальным индексам автодополнения об изменении в Redis (событие RD_UPDATED)
+    added - имя -> счет (время или 0 для карт), removed - удаленные имена, reset - added заменяет все
+    Сразу через notify, а не через очередь publish: потерянная при переполнении разница
+    (бан, разбан, удаление карты) оставила бы индекс неверным до переподключения к Redis
+  """
+  await observer.notify(Event.RD_UPDATED, {
+    "table": table,
+    "added": added or {},
+    "removed": removed or [],
+    "reset": reset
+  })
+
+# -- notify_index
+async def notify_index(table: str, added: Dict[str, float] = None, removed: list = None, reset: bool = False):
+  """
+    То же, что publish_index, и рассылка другим экземплярам бота
+    Полную замену они перечитывают из Redis сами, чтобы не гонять весь список через канал
+  """
+  await publish_index(table, added, removed, reset)
+
+  if reset:
+    await broadcast("index", table=table, reset=True)
+  else:
+    await broadcast("index", table=table, added=added or {}, removed=removed or [])
+
+# -- load_index
+@require_connection
+async def load_index(table: str):
+  """
+    Полностью загружает индекс автодополнения одной таблицы из Redis
+  """
+  if table in (RedisTable.LastPlayers, RedisTable.BannedPlayers):
+    entries = await rc.client.zrange(table, 0, -1, withscores=True)
+    added = {name.decode('utf-8'): score for name, score in entries}
+  else:
+    added = {name.decode('utf-8'): 0 for name in await rc.set_get(table)}
+
+  await publish_index(table, added=added, reset=True)
+
+# -- load_indexes
+@require_connection
+async def load_indexes():
+  """
+    Полностью загружает индексы автодополнения после подключения, дальше они обновляются по изменениям
+  """
+  for table in (RedisTable.LastPlayers, RedisTable.BannedPlayers, RedisTable.MapListAll, RedisTable.MapListActive):
+    await load_index(table)
+
+# SECTION Invalidation
+
+# -- broadcast
+@require_connection
+async def broadcast(kind: str, **data):
+  """
+    Сообщает другим экземплярам бота об изменении через REDIS_INVALIDATION_CHANNEL
+    kind: index - индекс автодополнения, steam - привязка SteamID, member - участник дискорда
+  """
+  await rc.publish(config.REDIS_INVALIDATION_CHANNEL, json.dumps({"source": instance_id, "kind": kind, **data}))
+
+# -- listen_invalidations
+async def listen_invalidations():
+  """
+    Подписка на REDIS_INVALIDATION_CHANNEL, живет все время работы бота
+    Пока подписки не было (запуск, Redis отключен), сообщения терялись - после каждой подписки
+    локальные кэши собираются заново. Это единственное место, где индексы загружаются целиком
+  """
+  while True:
+    if not rc.connected:
+      await asyncio.sleep(config.REDIS_HEARTBEAT_INTERVAL)
+      continue
+
+    # После переподключения в redis_heartbeat старый клиент закрыт - подписываемся заново через новый
+    client = rc.client
+
+    try:
+      async with rc.pubsub() as pubsub:
+        await pubsub.subscribe(config.REDIS_INVALIDATION_CHANNEL)
+        await resync_local_caches()
+
+        while rc.connected and rc.client is client:
+          message = await pubsub.get_message(timeout=1.0)
+          if message is not None:
+            await apply_invalidation(message['data'])
+
+    except asyncio.CancelledError:
+      raise
+    except Exception as err:
+      if rc.client is client and rc.handle_error(err):
+        on_disconnect()
+      logger.error(f"Redis: Канал {config.REDIS_INVALIDATION_CHANNEL}: {err}")
+      await asyncio.sleep(1)
+
+# -- apply_invalidation
+async def apply_invalidation(raw: bytes):
+  """
+    Применяет изменение от другого экземпляра бота к локальным кэшам
+  """
+  global steam_links_loaded
+
+  try:
+    message = json.loads(raw)
+  except ValueError:
+    logger.error(f"Redis: Некорректное сообщение в {config.REDIS_INVALIDATION_CHANNEL}: {raw!r}")
+    return
+
+  if message.get('source') == instance_id:
+    return
+
+  kind = message.get('kind')
+
+  if kind == "index":
+    if message.get('reset'):
+      await load_index(message['table'])
+    else:
+      await publish_index(message['table'], added=message.get('added'), removed=message.get('removed'))
+
+  elif kind == "steam":
+    steam_id = message.get('steam_id')
+    if steam_id is None:
+      # Другой экземпляр загрузил все привязки из SQL в общий Redis
+      cache_players.clear()
+      cache_players_missing.clear()
+      steam_links_loaded = True
+    else:
+      forget_steam_link(steam_id)
+
+  elif kind == "member":
+    await observer.notify(Event.RD_INVALIDATED, {"kind": "member", "discord_id": message.get('discord_id')})
+
+# -- resync_local_caches
+async def resync_local_caches():
+  """
+    Собирает заново все локальные кэши, которые обновляются через канал инвалидации
+    Старые списки переносятся до загрузки индексов (после перезапуска Redis мог поднять старые данные)
+  """
+  cache_players.clear()
+  cache_players_missing.clear()
+  await migrate_lists()
+  await load_indexes()
+  await observer.notify(Event.RD_INVALIDATED, {"kind": "member", "discord_id": None})
+
+# -- ev_member_update
+@observer.subscribe(Event.BE_MEMBER_UPDATE)
+async def ev_member_update(data):
+  await broadcast("member", discord_id=int(data['user_id']))
+
+# !SECTION
+
 # -- ev_add_ban
 @observer.subscribe(Event.BC_CS_BAN)
 @observer.subscribe(Event.BC_CS_BAN_OFFLINE)
@@ -61,7 +328,9 @@ async def ev_add_ban(data):
   """
     Добавляет игрока в список забанненых
   """
-  await rc.list_add(RedisTable.BannedPlayers, data['target'])
+  banned = {data['target']: time.time()}
+  await rc.zset_add(RedisTable.BannedPlayers, banned)
+  await notify_index(RedisTable.BannedPlayers, added=banned)
 
 # -- ev_unban_ban
 @observer.subscribe(Event.BC_CS_UNBAN)
@@ -70,22 +339,38 @@ async def ev_unban_ban(data):
   """
     Убирает игрока из списка забанненых
   """
-  await rc.list_delete(RedisTable.BannedPlayers, data['target'])
+  await rc.zset_delete(RedisTable.BannedPlayers, data['target'])
+  await notify_index(RedisTable.BannedPlayers, removed=[data['target']])
 
 # -- ev_add_players_to_list
-@observer.subscribe(Event.WBH_INFO)
-@require_connection
+@observer.subscribe(Event.WBH_PLAYERS)
 async def ev_add_players_to_list(data):
   """
-    Добавляет игроков в список LastPlayers
+    Добавляет игроков в LastPlayers (время последнего появления)
+    Неудачная запись попадает в лог Observer, следующий вебхук запишет игроков снова
   """
-  async with aioredis.Redis.from_pool(rc.pool)  as conn:
-    async with conn.pipeline() as pipe:
-      for player in data['current_players']:
-        pipe.lrem(RedisTable.LastPlayers, 0, player["name"])
-        pipe.rpush(RedisTable.LastPlayers, player["name"])
+  players = {player["name"]: time.time() for player in data['current_players']}
+  if not players:
+    return
 
-      await pipe.execute()
+  if not await write_last_players(players):
+    raise RedisError("Redis: LastPlayers не обновлен")
+
+# -- write_last_players
+@require_connection
+async def write_last_players(players: Dict[str, float]) -> bool:
+  # Запись и обрезка истории одной транзакцией: по возрасту и по количеству (оставляем самых свежих)
+  async with rc.client.pipeline(transaction=True) as pipe:
+    pipe.zadd(RedisTable.LastPlayers, players)
+    if config.LAST_PLAYERS_MAX_AGE:
+      pipe.zremrangebyscore(RedisTable.LastPlayers, "-inf", time.time() - config.LAST_PLAYERS_MAX_AGE)
+    if config.LAST_PLAYERS_MAX_ENTRIES:
+      pipe.zremrangebyrank(RedisTable.LastPlayers, 0, -config.LAST_PLAYERS_MAX_ENTRIES - 1)
+
+    await pipe.execute()
+
+  await notify_index(RedisTable.LastPlayers, added=players)
+  return True
         
 
 # -- ev_sync_maps
@@ -96,90 +381,208 @@ async def ev_sync_maps(*args):
     Удаляем все карты из редис
     Берем карты из SQL и добавляем их в редис
   """
-  await rc.list_clear(RedisTable.MapListAll)
-  await rc.list_clear(RedisTable.MapListActive)
-
   response = (await nsroute.call_route("/get_map_list"))
 
   if response is None:
+    await rc.client.delete(RedisTable.MapListAll, RedisTable.MapListActive)
+    await notify_index(RedisTable.MapListAll, reset=True)
+    await notify_index(RedisTable.MapListActive, reset=True)
     return
-  
-  async with aioredis.Redis.from_pool(rc.pool) as conn:
-    async with conn.pipeline() as pipe:
-      for map_name, activated in response:
-        pipe.rpush(RedisTable.MapListAll, map_name)
-        if activated:
-          pipe.rpush(RedisTable.MapListActive, map_name)
 
-      await pipe.execute()
+  all_maps = [map_name for map_name, _ in response]
+  active_maps = [map_name for map_name, activated in response if activated]
+
+  # Списки карт заменяются целиком одной транзакцией
+  async with rc.client.pipeline(transaction=True) as pipe:
+    pipe.delete(RedisTable.MapListAll, RedisTable.MapListActive)
+    if all_maps:
+      pipe.sadd(RedisTable.MapListAll, *all_maps)
+    if active_maps:
+      pipe.sadd(RedisTable.MapListActive, *active_maps)
+
+    await pipe.execute()
+
+  await notify_index(RedisTable.MapListAll, added=dict.fromkeys(all_maps, 0), reset=True)
+  await notify_index(RedisTable.MapListActive, added=dict.fromkeys(active_maps, 0), reset=True)
 
 
 # -- check_steam
 @nsroute.create_route("/CheckSteam")
 async def check_steam(steam_id: str):
   """
-    Проверяем, есть ли связь в Редис, если да, то возвращаем
-    Если нет, то делаем SQL запрос, и проверяем, существует ли
-    Если в SQL существует -> сохраняем в редис и возвращаем ответ
-    Если не существует -> Сохраняем в кэш как несуществующий(None) и возвращаем
+    Проверяем кэш процесса (в том числе кэш отсутствующих привязок)
+    Потом хэш SteamToDiscord в Редис
+    Если хэш загружен из SQL целиком, промах значит, что привязки нет, и в SQL не ходим
+    Иначе (Редис недоступен или еще не загружен) делаем SQL запрос и сохраняем ответ в Редис
   """
 
   # Проверяем
   if steam_id in cache_players:
     return cache_players[steam_id]
-  
+
+  if steam_id in cache_players_missing:
+    return None
+
+  # Редис
+  discord_id = None
+  redis_answered = False
+
+  if rc.connected:
+    try:
+      discord_id = await rc.get_hash(RedisTable.SteamToDiscord, steam_id)
+      redis_answered = True
+    except RedisError as err:
+      if rc.handle_error(err):
+        on_disconnect()
+      logger.error(f"Redis: {err}")
+
   # SQL
-  response = (await nsroute.call_route("/check_user", steam_id))
+  if discord_id is None and not (steam_links_loaded and redis_answered):
+    discord_id = await nsroute.call_route("/check_user", steam_id)
 
-  if response is None:
-    cache_players[steam_id] = None
+    if discord_id is not None:
+      await route_link_steam(steam_id, discord_id)
 
+  if discord_id is None:
+    cache_players_missing[steam_id] = True
   else:
-    cache_players[steam_id] = response
+    cache_players[steam_id] = discord_id
+
+  return discord_id
 
-  return cache_players[steam_id]
+# -- forget_steam_link
+def forget_steam_link(steam_id: str) -> None:
+  cache_players.pop(steam_id, None)
+  cache_players_missing.pop(steam_id, None)
+
+# -- forget_discord_link
+def forget_discord_link(discord_id: str) -> None:
+  """Сбрасывает кэш процесса по discord_id - без Redis steam_id для /unreg не узнать"""
+  for steam_id in [steam_id for steam_id, linked in cache_players.items() if str(linked) == str(discord_id)]:
+    forget_steam_link(steam_id)
+
+# -- route_load_steam_links
+@nsroute.create_route("/redis/load_steam_links")
+@require_connection
+async def route_load_steam_links(links: list) -> None:
+  """
+    Заменяет хэши привязок содержимым users из SQL (пары steam_id, discord_id) одной транзакцией
+  """
+  global steam_links_loaded
+
+  async with rc.client.pipeline(transaction=True) as pipe:
+    pipe.delete(RedisTable.SteamToDiscord, RedisTable.DiscordToSteam)
+    if links:
+      pipe.hset(RedisTable.SteamToDiscord, mapping={steam_id: str(discord_id) for steam_id, discord_id in links})
+      pipe.hset(RedisTable.DiscordToSteam, mapping={str(discord_id): steam_id for steam_id, discord_id in links})
+
+    await pipe.execute()
+
+  cache_players.clear()
+  cache_players_missing.clear()
+  steam_links_loaded = True
+  await broadcast("steam", steam_id=None)
+
+# -- route_link_steam
+@nsroute.create_route("/redis/link_steam")
+async def route_link_steam(steam_id: str, discord_id: str) -> None:
+  """
+    Вызывается после записи в SQL. Кэш процесса сбрасываем и без Redis, иначе промах
+    в cache_players_missing скрывал бы новую привязку до STEAM_CACHE_MISS_TTL
+    Если Redis недоступен, хэш исправит загрузка из SQL после переподключения,
+    а другие экземпляры соберут кэши заново после переподписки
+  """
+  forget_steam_link(steam_id)
+
+  if await write_steam_link(steam_id, discord_id):
+    await broadcast("steam", steam_id=steam_id)
+
+# -- write_steam_link
+@require_connection
+async def write_steam_link(steam_id: str, discord_id: str) -> bool:
+  async with rc.client.pipeline(transaction=True) as pipe:
+    pipe.hset(RedisTable.SteamToDiscord, steam_id, str(discord_id))
+    pipe.hset(RedisTable.DiscordToSteam, str(discord_id), steam_id)
+    await pipe.execute()
+
+  return True
+
+# -- route_unlink_steam
+@nsroute.create_route("/redis/unlink_steam")
+async def route_unlink_steam(discord_id: str) -> None:
+  """
+    Вызывается после удаления из SQL, кэш процесса сбрасываем и без Redis (см. route_link_steam)
+  """
+  forget_discord_link(discord_id)
+
+  steam_id = await delete_steam_link(discord_id)
+  if steam_id:
+    forget_steam_link(steam_id)
+    await broadcast("steam", steam_id=steam_id)
+
+# -- delete_steam_link
+@require_connection
+async def delete_steam_link(discord_id: str) -> str:
+  steam_id = await rc.get_hash(RedisTable.DiscordToSteam, str(discord_id))
+
+  if steam_id is None:
+    return None
+
+  async with rc.client.pipeline(transaction=True) as pipe:
+    pipe.hdel(RedisTable.SteamToDiscord, steam_id)
+    pipe.hdel(RedisTable.DiscordToSteam, str(discord_id))
+    await pipe.execute()
+
+  return steam_id
 
 # -- route_get_offline_players
 @nsroute.create_route("/redis/get_offline_players")
 @require_connection
 async def route_get_offline_players() -> list:
-  last_players: list = await rc.list_get(RedisTable.LastPlayers, 0)
+  """
+    Игроки из LastPlayers, самые свежие первыми
+  """
+  last_players: list = await rc.zset_get(RedisTable.LastPlayers)
   return [player.decode('utf-8') for player in last_players]
 
 # -- route_get_banned_players
 @nsroute.create_route("/redis/get_banned_players")
 @require_connection
 async def route_get_banned_players() -> list:
-  banned_players: list = await rc.list_get(RedisTable.BannedPlayers, 0)
+  banned_players: list = await rc.zset_get(RedisTable.BannedPlayers)
   return [player.decode('utf-8') for player in banned_players]
 
 # -- route_get_map_list_active
 @nsroute.create_route("/redis/get_map_list_active")
 @require_connection
 async def route_get_map_list_active() -> list:
-  map_list: list = await rc.list_get(RedisTable.MapListActive, 0)
-  return [map.decode('utf-8') for map in map_list]
+  map_list: list = await rc.set_get(RedisTable.MapListActive)
+  return sorted(map.decode('utf-8') for map in map_list)
 
 # -- route_get_map_list_all
 @nsroute.create_route("/redis/get_map_list_all")
 @require_connection
 async def route_get_map_list_all() -> list:
-  map_list: list = await rc.list_get(RedisTable.MapListAll, 0 )
-  return [map.decode('utf-8') for map in map_list]
+  map_list: list = await rc.set_get(RedisTable.MapListAll)
+  return sorted(map.decode('utf-8') for map in map_list)
 
 # -- route_update_map_list
 @nsroute.create_route("/redis/update_map_list")
 @require_connection
 async def route_update_map_list(type, map_name, activated=None):
   if type == "add":
-    await rc.list_add(RedisTable.MapListAll, map_name)
+    await rc.set_add(RedisTable.MapListAll, map_name)
+    await notify_index(RedisTable.MapListAll, added={map_name: 0})
     if activated == 1:
-      await rc.list_add(RedisTable.MapListActive, map_name)
+      await rc.set_add(RedisTable.MapListActive, map_name)
+      await notify_index(RedisTable.MapListActive, added={map_name: 0})
 
     
   elif type == "delete":
-    await rc.list_delete(RedisTable.MapListAll, map_name)
-    await rc.list_delete(RedisTable.MapListActive, map_name)
+    await rc.set_delete(RedisTable.MapListAll, map_name)
+    await rc.set_delete(RedisTable.MapListActive, map_name)
+    await notify_index(RedisTable.MapListAll, removed=[map_name])
+    await notify_index(RedisTable.MapListActive, removed=[map_name])
 
     
   elif type == "update":
@@ -187,8 +590,25 @@ async def route_update_map_list(type, map_name, activated=None):
       return
 
     if activated == 1:
-      # Нужно удалить, чтобы не было повторений
-      await rc.list_delete(RedisTable.MapListActive, map_name)
-      await rc.list_add(RedisTable.MapListActive, map_name)
+      await rc.set_add(RedisTable.MapListActive, map_name)
+      await notify_index(RedisTable.MapListActive, added={map_name: 0})
     elif activated == 0:
-      await rc.list_delete(RedisTable.MapListActive, map_name)
\ No newline at end of file
+      await rc.set_delete(RedisTable.MapListActive, map_name)
+      await notify_index(RedisTable.MapListActive, removed=[map_name])
+
+# -- route_get_message_anchor
+@nsroute.create_route("/redis/get_message_anchor")
+@require_connection
+async def route_get_message_anchor(key: str) -> int:
+  """
+    id сообщения, 0 - якоря нет (None остается за require_connection: Redis не ответил)
+  """
+  message_id = await rc.get_hash(RedisTable.MessageAnchors, key)
+  return int(message_id) if message_id else 0
+
+# -- route_set_message_anchor
+@nsroute.create_route("/redis/set_message_anchor")
+@require_connection
+async def route_set_message_anchor(key: str, message_id: int) -> bool:
+  await rc.set_hash(RedisTable.MessageAnchors, key, str(message_id))
+  return True
@@ -1,5 +1,5 @@
-from observer.observer_client import observer, logger, nsroute, Event, Param
-from data_server.asyncsql import AioMysql, QueryError, ConnectionError as aioConnectionError
+from observer.observer_client import observer, logger, nsroute, metrics, Event, Param
+from data_server.asyncsql import AioMysql, QueryError, DuplicateKeyError, ConnectionError as aioConnectionError
 
 import discord
 import re
@@ -10,7 +10,17 @@ mysql: AioMysql = AioMysql(host=config.DB_HOST,
                            port=config.DB_PORT,
                            user=config.DB_USER,
                            password=config.DB_PASSWORD,
-                           db=config.DB_NAME)
+                           db=config.DB_NAME,
+                           minsize=config.DB_POOL_MINSIZE,
+                           maxsize=config.DB_POOL_MAXSIZE,
+                           pool_recycle=config.DB_POOL_RECYCLE,
+                           connect_timeout=config.DB_CONNECT_TIMEOUT,
+                           autocommit=config.DB_AUTOCOMMIT,
+                           found_rows=True)
+
+metrics.register_gauge("dbot_mysql_pool_connections", "Соединения в пуле MySQL", mysql.pool_stats, label="state")
+metrics.register_histograms("dbot_mysql_acquire_wait_seconds", "Ожидание свободного соединения в пуле MySQL",
+                            lambda: {"main": mysql.acquire_wait}, label="pool")
 
 # SECTION Utility
 
@@ -28,42 +38,33 @@ def require_connection(func) -> callable:
   
   return wrapper
 
-# -- steam_record_exist
-@require_connection
-async def steam_record_exist(user_id: str, steam_id: str):
-  query = "SELECT COUNT(*) FROM users WHERE discord_id = %s OR steam_id = %s"
-  query_values = (user_id, steam_id)
-
-  try:
-    response = await mysql.execute_select(query, query_values)
+# Уникальные ключи, на которых держатся INSERT в ev_reg и ev_map_add: таблица, имя ключа, столбец
+UNIQUE_KEYS = [
+  ("users", "uq_users_discord_id", "discord_id"),
+  ("users", "uq_users_steam_id", "steam_id"),
+  ("maps", "uq_maps_map_name", "map_name"),
+]
 
-    if not response or not response[0]:
-      return False  # Если нет результатов, возвращаем False
-
-    rows = response[0][0]
-
-    return rows != 0
-  except QueryError as err:
-    logger.error(f"{err}")
-
-# -- map_record_exist
+# -- migrate_unique_keys
 @require_connection
-async def map_record_exist(map_name: str):
-  query = "SELECT COUNT(*) FROM maps WHERE map_name = %s"
-  query_values = (map_name,)
-
-  try:
-    response = await mysql.execute_select(query, query_values)
-
-    if not response or not response[0]:
-      return False  # Если нет результатов, возвращаем False
-
-    rows = response[0][0]
-
-    return rows != 0
-  except QueryError as err:
-    logger.error(f"{err}")
-    return None
+async def migrate_unique_keys():
+  """
+    Разовая миграция: добавляет уникальные ключи, которых нет (старые БД создавались без них)
+    Если в таблице уже есть дубликаты, ключ не добавится - это пишется в лог, и дубликаты нужно убрать вручную
+  """
+  query = ("SELECT INDEX_NAME FROM information_schema.STATISTICS "
+           "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND NON_UNIQUE = 0 "
+           "GROUP BY INDEX_NAME HAVING COUNT(*) = 1 AND MAX(COLUMN_NAME) = %s")
+
+  for table, key_name, column in UNIQUE_KEYS:
+    try:
+      if await mysql.execute_select(query, (table, column)):
+        continue
+
+      await mysql.execute_change(f"ALTER TABLE {table} ADD UNIQUE KEY {key_name} ({column})")
+      logger.info(f"MySQL: Добавлен уникальный ключ {table}.{column}")
+    except QueryError as err:
+      logger.error(f"MySQL: Не удалось добавить уникальный ключ {table}.{column}, повторы не будут отклоняться: {err}")
 
 # -- check_steam_id
 def check_steam_id(steam_id: str):
@@ -80,6 +81,21 @@ async def ev_ready():
     logger.info("MySQL: Успешно подключен")
   except aioConnectionError as err:
     logger.error(f"MySQL: {err}")
+    return
+
+  # Пул уже создан: неудачный прогрев не мешает работе, соединения откроются по запросу
+  try:
+    logger.info(f"MySQL: Готово соединений: {await mysql.warm_up()}")
+  except aioConnectionError as err:
+    logger.error(f"MySQL: {err}")
+
+  await migrate_unique_keys()
+
+  # Привязки SteamID -> Discord копируются в Редис (он подключается раньше, см. порядок BE_READY)
+  links = await route_get_steam_links()
+  if links is not None:
+    await nsroute.call_route("/redis/load_steam_links", links)
+    logger.info(f"MySQL: Привязки SteamID загружены в Redis: {len(links)}")
 
 # -- ev_reg
 @observer.subscribe(Event.BC_REG)
@@ -94,12 +110,7 @@ async def ev_reg(data):
     await interaction.followup.send('Неправильный формат SteamID', ephemeral=True)
     return
 
-  # проверяем существует ли запись
-  if await steam_record_exist(user_id, steam_id):
-    await interaction.followup.send(f'Данные для данного SteamID или вашего аккаунта уже существуют.', ephemeral=True)
-    return
-
-  # сохраняем
+  # сохраняем одним запросом: уникальные ключи discord_id и steam_id (см. UNIQUE_KEYS) не дадут записать дубликат
   username = interaction.user.name
   ds_username = interaction.user.display_name
 
@@ -111,7 +122,10 @@ async def ev_reg(data):
     if rows == 0:
       await interaction.followup.send('Не удалось сохранить данные', ephemeral=True)
     else:
+      await nsroute.call_route("/redis/link_steam", steam_id, user_id)
       await interaction.followup.send('Данные сохранены!', ephemeral=True)
+  except DuplicateKeyError:
+    await interaction.followup.send(f'Данные для данного SteamID или вашего аккаунта уже существуют.', ephemeral=True)
   except QueryError as err:
     logger.error(f"{err}")
     await interaction.followup.send('Ошибка!', ephemeral=True)
@@ -132,6 +146,7 @@ async def ev_unreg(data):
     if rows == 0:
       await interaction.followup.send('Данные не найдены', ephemeral=True)
     else:
+      await nsroute.call_route("/redis/unlink_steam", user_id)
       await interaction.followup.send('Данные удалены!', ephemeral=True)
 
   except QueryError as err:
@@ -144,29 +159,25 @@ async def ev_unreg(data):
 async def ev_map_add(data):
   interaction: discord.Interaction = data[Param.Interaction]
 
-  # Проверяем в БД на сущестовование
-  response = await map_record_exist(data['map_name'])
-  if response:
-    await interaction.followup.send(f'Такая карта уже существует', ephemeral=True)
-    return
-  if response is None:
-    await interaction.followup.send(f'Произошла ошибка!', ephemeral=True)
-    return
-  
-
-  # Сохраняем в БД
+  # Сохраняем в БД. Существующую карту отклонит уникальный ключ map_name (см. UNIQUE_KEYS)
   query = "INSERT INTO maps (map_name, activated, min_players, max_players, priority) VALUES (%s, %s, %s, %s, %s)"
   query_values = (data['map_name'], data['activated'], data['min_players'], data['max_players'], data['priority'])
 
   try:
     rows = await mysql.execute_change(query, query_values)
-    if rows == 0:
-      await interaction.followup.send('Не удалось добавить карту', ephemeral=True)
-    else:
-      await interaction.followup.send('Карта добавлена!', ephemeral=True)
+  except DuplicateKeyError:
+    await interaction.followup.send(f'Такая карта уже существует', ephemeral=True)
+    return
   except QueryError as err:
     logger.error(f"{err}")
     await interaction.followup.send('Ошибка!', ephemeral=True)
+    return
+
+  if rows == 0:
+    await interaction.followup.send('Не удалось добавить карту', ephemeral=True)
+    return
+
+  await interaction.followup.send('Карта добавлена!', ephemeral=True)
 
   # Сохраняем в редис
   await nsroute.call_route("/redis/update_map_list", "add", data['map_name'], data['activated'])
@@ -200,15 +211,6 @@ async def ev_map_delete(data):
 async def ev_map_update(data):
   interaction: discord.Interaction = data[Param.Interaction]
 
-  # Проверяем в БД на сущестовование
-  response = await map_record_exist(data['map_name'])
-  if not response:
-    await interaction.followup.send(f'Карты не существует', ephemeral=True)
-    return
-  if response is None:
-    await interaction.followup.send(f'Произошла ошибка!', ephemeral=True)
-    return
-  
   updates: list = []
   query_values: list = []
 
@@ -232,19 +234,23 @@ async def ev_map_update(data):
     await interaction.followup.send('Вы не выбрали что обновить!', ephemeral=True)
     return
 
-  # Обновляем в БД
+  # Обновляем в БД. С found_rows UPDATE возвращает найденные строки, а не измененные:
+  # 0 - карты нет, даже если новые значения совпали со старыми
   query = f"UPDATE maps SET {', '.join(updates)} WHERE map_name = %s"
   query_values.append(data['map_name'])
 
   try:
     rows = await mysql.execute_change(query, query_values)
-    if rows == 0:
-      await interaction.followup.send('Такой карты не существует', ephemeral=True)
-    else:
-      await interaction.followup.send('Карта Обновлена!', ephemeral=True)
   except QueryError as err:
     logger.error(f"{err}")
     await interaction.followup.send('Ошибка!', ephemeral=True)
+    return
+
+  if rows == 0:
+    await interaction.followup.send('Такой карты не существует', ephemeral=True)
+    return
+
+  await interaction.followup.send('Карта Обновлена!', ephemeral=True)
 
   # Обновляем в редис
   await nsroute.call_route("/redis/update_map_list", "update", data['map_name'], data['activated'])
@@ -283,6 +289,18 @@ async def route_check_user(steam_id):
   except QueryError as err:
     logger.error(f"{err}")
 
+# -- (route) get_steam_links
+@nsroute.create_route("/get_steam_links")
+@require_connection
+async def route_get_steam_links():
+  query = "SELECT steam_id, discord_id FROM users"
+
+  try:
+    response = await mysql.execute_select(query)
+    return list(response or [])
+  except QueryError as err:
+    logger.error(f"{err}")
+
 # - (route) get_map_list
 @nsroute.create_route("/get_map_list")
 @require_connection
@@ -0,0 +1,268 @@
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+# Значение датчика: число или {значение метки: число}. None - датчик сейчас недоступен
+GaugeValue = Optional[Union[float, Dict[str, float]]]
+
+# SECTION Histogram
+
+# Границы корзин в секундах: 1 мс * 2^i, последняя ~65 с. Все, что дольше, попадает в +Inf
+BUCKETS: List[float] = [0.001 * 2 ** i for i in range(17)]
+
+class Histogram:
+  """Гистограмма длительностей с фиксированными корзинами.
+
+  Хранит только счетчики корзин, поэтому память не растет с числом вызовов,
+  а перцентили получаются с точностью до корзины (с интерполяцией внутри нее).
+  """
+  def __init__(self, buckets: List[float] = BUCKETS) -> None:
+    self.buckets: List[float] = buckets
+    self.counts: List[int] = [0] * (len(buckets) + 1)
+    self.count: int = 0
+    self.errors: int = 0
+    self.sum: float = 0.0
+    self.max: float = 0.0
+
+  def observe(self, seconds: float, error: bool = False) -> None:
+    """Добавляет замер.
+
+    Args:
+      seconds (float): Длительность вызова.
+      error (bool): Вызов завершился ошибкой.
+    """
+    index = len(self.buckets)
+    for i, bound in enumerate(self.buckets):
+      if seconds <= bound:
+        index = i
+        break
+
+    self.counts[index] += 1
+    self.count += 1
+    self.sum += seconds
+    self.max = max(self.max, seconds)
+    if error:
+      self.errors += 1
+
+  def percentile(self, q: float) -> float:
+    """Оценка перцентиля.
+
+    Args:
+      q (float): Перцентиль от 0 до 1 (0.95 - p95).
+
+    Returns:
+      float: Длительность в секундах, 0 если замеров нет.
+    """
+    if not self.count:
+      return 0.0
+
+    rank = q * self.count
+    cumulative = 0
+    for i, bucket_count in enumerate(self.counts):
+      if cumulative + bucket_count >= rank and bucket_count:
+        lower = self.buckets[i - 1] if i > 0 else 0.0
+        upper = self.buckets[i] if i < len(self.buckets) else self.max
+        value = lower + (upper - lower) * (rank - cumulative) / bucket_count
+        return min(value, self.max)
+      cumulative += bucket_count
+
+    return self.max
+
+  def summary(self) -> Dict[str, float]:
+    """Счетчики и перцентили одним словарем (длительности в секундах)."""
+    return {
+      "count": self.count,
+      "errors": self.errors,
+      "avg": self.sum / self.count if self.count else 0.0,
+      "p50": self.percentile(0.50),
+      "p95": self.percentile(0.95),
+      "p99": self.percentile(0.99),
+      "max": self.max,
+    }
+
+# !SECTION
+
+# SECTION Metrics
+
+class Metrics:
+  """Реестр гистограмм по именам.
+
+  Имена: "event.<событие>" - вся рассылка события, "subscriber.<модуль>.<функция>" -
+  отдельный подписчик, "route.<путь>" - вызов NoServerRoute.
+  """
+  def __init__(self, render_ttl: float = 1.0) -> None:
+    """
+    Args:
+      render_ttl (float): Сколько секунд отдавать уже отрисованный текст render_prometheus().
+    """
+    self.histograms: Dict[str, Histogram] = {}
+    self.started_at: float = time.monotonic()
+    self._reported_at: float = self.started_at
+    self._reported_counts: Dict[str, int] = {}
+
+    # Экспорт в формате Prometheus
+    self.render_ttl: float = render_ttl
+    # (имя, описание, метка, callback, тип: gauge или counter)
+    self._gauges: List[Tuple[str, str, str, Callable[[], GaugeValue], str]] = []
+    self._histogram_families: List[Tuple[str, str, str, Callable[[], Dict[str, Histogram]]]] = []
+    self._rendered: str = ""
+    self._rendered_at: float = 0.0
+    self._rendered_histograms: Dict[Tuple[str, str], Tuple[int, str]] = {}
+
+  def observe(self, name: str, seconds: float, error: bool = False) -> None:
+    """Добавляет замер в гистограмму name (создается при первом замере)."""
+    histogram = self.histograms.get(name)
+    if histogram is None:
+      histogram = self.histograms[name] = Histogram()
+    histogram.observe(seconds, error)
+
+  @contextmanager
+  def measure(self, name: str) -> Iterator[None]:
+    """Замеряет блок кода. Исключение считается ошибкой и пробрасывается дальше.
+
+    Args:
+      name (str): Имя гистограммы.
+    """
+    started = time.perf_counter()
+    try:
+      yield
+    except BaseException:
+      self.observe(name, time.perf_counter() - started, error=True)
+      raise
+    self.observe(name, time.perf_counter() - started)
+
+  def snapshot(self, prefix: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Сводка по всем гистограммам.
+
+    Args:
+      prefix (Optional[str]): Только имена с этим префиксом (например, "route.").
+
+    Returns:
+      Dict[str, Dict[str, float]]: Имя -> count, errors, avg, p50, p95, p99, max.
+    """
+    return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())
+            if prefix is None or name.startswith(prefix)}
+
+  def report(self) -> str:
+    """Текстовый отчет для лога: пропускная способность за время с прошлого отчета и задержки."""
+    now = time.monotonic()
+    interval = max(now - self._reported_at, 1e-9)
+    lines = []
+
+    for name, summary in self.snapshot().items():
+      calls = summary["count"] - self._reported_counts.get(name, 0)
+      self._reported_counts[name] = summary["count"]
+      lines.append(f"{name}: {calls / interval:.2f}/с, всего {summary['count']}, ошибок {summary['errors']}, "
+                   f"p50 {summary['p50'] * 1000:.1f} мс, p95 {summary['p95'] * 1000:.1f} мс, "
+                   f"p99 {summary['p99'] * 1000:.1f} мс, max {summary['max'] * 1000:.1f} мс")
+
+    self._reported_at = now
+    return "\n".join(lines)
+
+  def register_gauge(self, name: str, help: str, callback: Callable[[], GaugeValue], label: str = "name") -> None:
+    """Регистрирует датчик, значение которого читается в момент выгрузки.
+
+    Args:
+      name (str): Имя метрики Prometheus (например, "dbot_redis_pool_connections").
+      help (str): Описание метрики.
+      callback (Callable[[], GaugeValue]): Возвращает число или словарь {значение метки: число}.
+      label (str): Имя метки для словаря.
+    """
+    self._gauges.append((name, help, label, callback, "gauge"))
+
+  def register_counter(self, name: str, help: str, callback: Callable[[], GaugeValue], label: str = "name") -> None:
+    """Регистрирует счетчик, который ведет сам модуль (только растет, имя оканчивается на _total).
+
+    В отличие от датчика выгружается как counter, поэтому к нему применимы rate() и increase().
+
+    Args:
+      name (str): Имя метрики Prometheus (например, "dbot_rcon_timeouts_total").
+      help (str): Описание метрики.
+      callback (Callable[[], GaugeValue]): Возвращает число или словарь {значение метки: число}.
+      label (str): Имя метки для словаря.
+    """
+    self._gauges.append((name, help, label, callback, "counter"))
+
+  def register_histograms(self, name: str, help: str, callback: Callable[[], Dict[str, Histogram]], label: str = "name") -> None:
+    """Регистрирует гистограммы, которые ведет сам модуль (например, RTT RCON по серверам).
+
+    Args:
+      name (str): Имя метрики Prometheus.
+      help (str): Описание метрики.
+      callback (Callable[[], Dict[str, Histogram]]): Возвращает {значение метки: гистограмма}.
+      label (str): Имя метки.
+    """
+    self._histogram_families.append((name, help, label, callback))
+
+  def render_prometheus(self) -> str:
+    """Текст для /metrics в формате Prometheus.
+
+    Результат кэшируется на render_ttl секунд, а гистограммы без новых замеров
+    не перерисовываются, поэтому частый опрос почти ничего не стоит.
+    """
+    now = time.monotonic()
+    if self._rendered and now - self._rendered_at < self.render_ttl:
+      return self._rendered
+
+    families = [("dbot_latency_seconds", "Время обработки событий, подписчиков, маршрутов и HTTP-запросов",
+                 "name", lambda: self.histograms)] + self._histogram_families
+    parts = []
+
+    for name, help, label, callback in families:
+      histograms = callback()
+      parts.append(f"# HELP {name} {help}\n# TYPE {name} histogram\n")
+      parts.extend(self._render_histogram(name, label, value, histogram) for value, histogram in histograms.items())
+      parts.append(f"# TYPE {name}_errors_total counter\n")
+      parts.extend(f"{name}_errors_total{{{label}=\"{_escape(value)}\"}} {histogram.errors}\n"
+                   for value, histogram in histograms.items())
+
+    for name, help, label, callback, kind in self._gauges:
+      try:
+        value = callback()
+      except Exception:
+        value = None
+      if value is None:
+        continue
+
+      parts.append(f"# HELP {name} {help}\n# TYPE {name} {kind}\n")
+      if isinstance(value, dict):
+        parts.extend(f"{name}{{{label}=\"{_escape(key)}\"}} {_number(number)}\n" for key, number in value.items())
+      else:
+        parts.append(f"{name} {_number(value)}\n")
+
+    self._rendered = "".join(parts)
+    self._rendered_at = now
+    return self._rendered
+
+  def _render_histogram(self, name: str, label: str, value: str, histogram: Histogram) -> str:
+    """Строки одной гистограммы, перерисовываются только при новых замерах."""
+    cached = self._rendered_histograms.get((name, value))
+    if cached and cached[0] == histogram.count:
+      return cached[1]
+
+    labels = f"{label}=\"{_escape(value)}\""
+    lines = []
+    cumulative = 0
+    for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+      cumulative += bucket_count
+      lines.append(f"{name}_bucket{{{labels},le=\"{bound:g}\"}} {cumulative}\n")
+    lines.append(f"{name}_bucket{{{labels},le=\"+Inf\"}} {histogram.count}\n")
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}\n")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}\n")
+
+    text = "".join(lines)
+    self._rendered_histograms[(name, value)] = (histogram.count, text)
+    return text
+
+def _escape(value: str) -> str:
+  """Экранирование значения метки Prometheus."""
+  return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _number(value: float) -> str:
+  """Число в формате Prometheus."""
+  if isinstance(value, (bool, int)):
+    return str(int(value))
+  return "NaN" if math.isnan(value) else repr(float(value))
+
+# !SECTION
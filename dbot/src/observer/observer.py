@@ -1,6 +1,11 @@
 import asyncio
+import logging
+import time
+from collections import deque
 from enum import Enum
-from typing import Callable, Dict, List
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from observer.metrics import Metrics
 
 class Param(Enum):
   Interaction = "interaction",
@@ -16,8 +21,13 @@ class Event(Enum):
 
   # WebHook events
   WBH_INFO = "wbh_info"
+  WBH_PLAYERS = "wbh_players"
   WBH_MESSAGE = "wbh_message"
 
+  # Redis events
+  RD_UPDATED = "rd_updated"
+  RD_INVALIDATED = "rd_invalidated"
+
   # Bot events
   BE_READY = "be_ready"
   BE_MESSAGE = "be_message"
@@ -47,11 +57,123 @@ class Event(Enum):
   BC_CS_MAP_CHANGE = "bc_cs_map_change"
 
 
+class Dispatch(Enum):
+  # Подписчики вызываются по очереди, ошибка прерывает рассылку (по умолчанию)
+  SEQUENTIAL = "sequential"
+  # Подписчики вызываются одновременно, у каждого свой таймаут, ошибки изолированы
+  CONCURRENT = "concurrent"
+
+class Overflow(Enum):
+  # Выкинуть самое старое событие из очереди (кроме событий с BLOCK), если таких нет - само новое событие
+  DROP_OLDEST = "drop_oldest"
+  # Заменить данные уже ожидающего события того же типа, иначе как DROP_OLDEST
+  COALESCE = "coalesce"
+  # Ждать, пока в очереди освободится место
+  BLOCK = "block"
+
+class _EventOptions:
+  """Настройки рассылки одного события, см. Observer.configure()."""
+  __slots__ = ("dispatch", "timeout", "overflow", "coalesce", "coalesce_key", "fingerprint")
+
+  def __init__(self, dispatch: Dispatch = Dispatch.SEQUENTIAL, timeout: Optional[float] = None,
+               overflow: Optional[Overflow] = None, coalesce: bool = False,
+               coalesce_key: Optional[Callable[..., Hashable]] = None,
+               fingerprint: Optional[Callable[..., Hashable]] = None) -> None:
+    self.dispatch: Dispatch = dispatch
+    self.timeout: Optional[float] = timeout
+    self.overflow: Optional[Overflow] = overflow
+    self.coalesce: bool = coalesce
+    self.coalesce_key: Optional[Callable[..., Hashable]] = coalesce_key
+    self.fingerprint: Optional[Callable[..., Hashable]] = fingerprint
+
+  def key(self, args: tuple, kwargs: dict) -> Hashable:
+    """Ключ снимка состояния (например, server_id), None - один снимок на событие."""
+    return self.coalesce_key(*args, **kwargs) if self.coalesce_key else None
+
+class _QueuedEvent:
+  """Событие, ожидающее обработки в очереди publish()."""
+  __slots__ = ("event", "key", "args", "kwargs", "overflow", "published_at", "dropped")
+
+  def __init__(self, event: Event, key: Hashable, args: tuple, kwargs: dict, overflow: Overflow) -> None:
+    self.event: Event = event
+    self.key: Hashable = key
+    self.args: tuple = args
+    self.kwargs: dict = kwargs
+    self.overflow: Overflow = overflow
+    self.published_at: float = time.monotonic()
+    # Выкинуто при переполнении, обработчик его пропустит
+    self.dropped: bool = False
+
 # SECTION Observer
+
+def _subscriber_name(callback: Callable) -> str:
+  """Имя гистограммы подписчика: по модулю видно, кто тормозит - дискорд, редис, mysql или rcon."""
+  return f"subscriber.{callback.__module__}.{callback.__qualname__}"
+
 class Observer:
-  def __init__(self) -> None:
-    """Инициализация наблюдателя с пустым списком подписчиков."""
+  def __init__(self, error_handler: Optional[Callable[[str], None]] = None,
+               queue_size: int = 1000, workers: int = 1, overflow: Overflow = Overflow.DROP_OLDEST,
+               metrics: Optional[Metrics] = None) -> None:
+    """Инициализация наблюдателя с пустым списком подписчиков.
+
+    Args:
+      error_handler (Optional[Callable[[str], None]]): Куда сообщать об ошибках подписчиков
+        в режиме Dispatch.CONCURRENT и в фоновой очереди. Вызывается внутри except, поэтому может писать трассировку.
+      queue_size (int): Размер очереди publish().
+      workers (int): Сколько обработчиков разбирают очередь publish().
+      overflow (Overflow): Что делать при переполнении очереди, если для события не задано иное.
+      metrics (Optional[Metrics]): Куда писать время рассылки событий и отдельных подписчиков.
+    """
     self._subscribers: Dict[str, List[Callable]] = {}
+    self._options: Dict[str, _EventOptions] = {}
+    self._error_handler: Callable[[str], None] = error_handler or logging.exception
+    self.metrics: Metrics = metrics or Metrics()
+
+    # Фоновая очередь publish(), создается при первой публикации внутри цикла событий.
+    # Обработчик забирает событие из общей очереди в очередь его типа (_backlogs) и разбирает ее,
+    # если этот тип еще никто не обрабатывает. Иначе событие дождется своей очереди у того обработчика,
+    # а этот берет следующее - поток событий одного типа не занимает всех обработчиков.
+    self.queue_size: int = queue_size
+    self.workers: int = max(1, workers)
+    self.overflow: Overflow = overflow
+    self._queue: Optional[asyncio.Queue] = None
+    self._worker_tasks: List[asyncio.Task] = []
+    self._backlogs: Dict[str, Deque[_QueuedEvent]] = {}
+    self._draining: Set[str] = set()
+    # Опубликованные, но еще не начатые события (общая очередь и очереди типов) в порядке публикации,
+    # ограничено queue_size
+    self._waiting: Dict[int, _QueuedEvent] = {}
+    self._space: Optional[asyncio.Condition] = None
+    self._pending: Dict[Tuple[str, Hashable], _QueuedEvent] = {}
+    self._fingerprints: Dict[Tuple[str, Hashable], Hashable] = {}
+
+    # Метрики очереди
+    self.published: int = 0
+    self.processed: int = 0
+    self.dropped: int = 0
+    self.coalesced: int = 0
+    self.unchanged: int = 0
+    self.lag_last: float = 0.0
+    self.lag_max: float = 0.0
+
+  def configure(self, event: Event, dispatch: Dispatch = Dispatch.SEQUENTIAL, timeout: Optional[float] = None,
+                overflow: Optional[Overflow] = None, coalesce: bool = False,
+                coalesce_key: Optional[Callable[..., Hashable]] = None,
+                fingerprint: Optional[Callable[..., Hashable]] = None) -> None:
+    """Задает режим рассылки события. Все параметры задаются разом.
+
+    Args:
+      event (Event): Событие.
+      dispatch (Dispatch): Последовательно или одновременно вызывать подписчиков.
+      timeout (Optional[float]): Таймаут на одного подписчика в секундах (только для CONCURRENT).
+      overflow (Optional[Overflow]): Политика переполнения очереди для события (None - общая).
+      coalesce (bool): Событие - снимок состояния: в очереди publish() живет только последний
+        необработанный снимок на ключ (latest-wins).
+      coalesce_key (Optional[Callable[..., Hashable]]): Ключ снимка из аргументов события (например, server_id).
+      fingerprint (Optional[Callable[..., Hashable]]): Хэш содержимого снимка. Если он совпал
+        с последним обработанным для того же ключа, подписчики не вызываются.
+    """
+    self._options[event.value] = _EventOptions(dispatch, timeout, overflow, coalesce, coalesce_key, fingerprint)
 
   def subscribe(self, event: Event) -> Callable:
     """Декоратор для подписки на событие.
@@ -69,26 +191,212 @@ class Observer:
       return callback
     return decorator
 
-  async def notify(self, event: Event, *args, **kwargs) -> None:
+  async def notify(self, event: Event, *args, **kwargs) -> bool:
     """Уведомление всех подписчиков о событии.
 
     Args:
       event (Event): Название события, о котором нужно уведомить подписчиков.
       *args: Аргументы, которые будут переданы в функции обратного вызова.
       **kwargs: Ключевые аргументы, которые будут переданы в функции обратного вызова.
+
+    Returns:
+      bool: True, если все подписчики отработали без ошибок. В режиме SEQUENTIAL ошибка пробрасывается.
     """
-    if event.value in self._subscribers:
+    if event.value not in self._subscribers:
+      return True
+
+    options = self._options.get(event.value) or _EventOptions()
+
+    with self.metrics.measure(f"event.{event.value}"):
+      if options.dispatch == Dispatch.CONCURRENT:
+        results = await asyncio.gather(*(self._call_isolated(event, callback, options.timeout, args, kwargs)
+                                         for callback in self._subscribers[event.value]))
+        return all(results)
+
       for callback in self._subscribers[event.value]:
         # await asyncio.sleep(0)  # Позволяет другим задачам выполняться
-        await callback(*args, **kwargs)
+        with self.metrics.measure(_subscriber_name(callback)):
+          await callback(*args, **kwargs)
+
+    return True
+
+  async def publish(self, event: Event, *args, **kwargs) -> None:
+    """Ставит событие в фоновую очередь и сразу возвращает управление.
+
+    События одного типа обрабатываются в порядке публикации, разных типов - параллельно
+    (до workers одновременно). При переполнении действует политика Overflow события.
+
+    Args:
+      event (Event): Событие.
+      *args: Аргументы для подписчиков.
+      **kwargs: Ключевые аргументы для подписчиков.
+    """
+    self._start_workers()
+    self.published += 1
+
+    options = self._options.get(event.value) or _EventOptions()
+    key = options.key(args, kwargs)
+    pending = self._pending.get((event.value, key))
+
+    # Снимок состояния: заменяем еще не обработанный снимок новым
+    if options.coalesce and pending:
+      pending.args, pending.kwargs = args, kwargs
+      self.coalesced += 1
+      return
+
+    overflow = options.overflow or self.overflow
+
+    if len(self._waiting) >= self.queue_size:
+      if overflow == Overflow.COALESCE and pending:
+        pending.args, pending.kwargs = args, kwargs
+        self.coalesced += 1
+        return
+
+      if overflow == Overflow.BLOCK:
+        async with self._space:
+          await self._space.wait_for(lambda: len(self._waiting) < self.queue_size)
+      elif not self._drop_oldest():
+        # В очереди только события, которые нельзя терять - теряем новое
+        self.dropped += 1
+        return
+
+    item = _QueuedEvent(event, key, args, kwargs, overflow)
+    self._waiting[id(item)] = item
+    self._pending[(event.value, key)] = item
+    self._queue.put_nowait(item)
+
+  def queue_stats(self) -> Dict[str, Any]:
+    """Метрики фоновой очереди.
+
+    Returns:
+      Dict[str, Any]: Глубина очереди, счетчики и задержка (lag) от публикации до начала обработки в секундах.
+    """
+    return {
+      "depth": len(self._waiting),
+      "maxsize": self.queue_size,
+      "workers": len(self._worker_tasks),
+      "published": self.published,
+      "processed": self.processed,
+      "dropped": self.dropped,
+      "coalesced": self.coalesced,
+      "unchanged": self.unchanged,
+      "lag_last": self.lag_last,
+      "lag_max": self.lag_max,
+    }
+
+  def _start_workers(self) -> None:
+    """Создает очередь и обработчики при первой публикации."""
+    if self._queue is None:
+      self._queue = asyncio.Queue()
+      self._space = asyncio.Condition()
+
+    if not self._worker_tasks:
+      self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+  def _forget(self, item: _QueuedEvent) -> None:
+    """Убирает событие из списка ожидающих, если оно последнее своего типа."""
+    if self._pending.get((item.event.value, item.key)) is item:
+      del self._pending[(item.event.value, item.key)]
+
+  def _drop_oldest(self) -> bool:
+    """Выкидывает самое старое еще не начатое событие, кроме событий с политикой BLOCK.
+
+    Returns:
+      bool: False, если в очереди только события с политикой BLOCK.
+    """
+    for dropped in self._waiting.values():
+      if dropped.overflow != Overflow.BLOCK:
+        break
+    else:
+      return False
+
+    # Событие остается в общей очереди или очереди типа, обработчик пропустит его в _process()
+    dropped.dropped = True
+    del self._waiting[id(dropped)]
+    self._forget(dropped)
+    self.dropped += 1
+    return True
+
+  async def _worker(self) -> None:
+    """Разбирает очередь publish()."""
+    while True:
+      item: _QueuedEvent = await self._queue.get()
+      event = item.event.value
+      self._backlogs.setdefault(event, deque()).append(item)
+
+      # Этот тип уже обрабатывает другой обработчик - он заберет событие по порядку
+      if event in self._draining:
+        continue
+
+      self._draining.add(event)
+      try:
+        backlog = self._backlogs[event]
+        while backlog:
+          await self._process(backlog.popleft())
+      finally:
+        self._draining.discard(event)
+
+  async def _process(self, item: _QueuedEvent) -> None:
+    """Рассылает одно событие из очереди."""
+    if item.dropped:
+      self._queue.task_done()
+      return
+
+    self._forget(item)
+    del self._waiting[id(item)]
+    async with self._space:
+      self._space.notify_all()
+
+    self.lag_last = time.monotonic() - item.published_at
+    self.lag_max = max(self.lag_max, self.lag_last)
+
+    try:
+      await self._notify_snapshot(item)
+    except Exception as err:
+      self._error_handler(f"Observer: {item.event.value}: ошибка при обработке из очереди: {err}")
+
+    self.processed += 1
+    self._queue.task_done()
+
+  async def _notify_snapshot(self, item: _QueuedEvent) -> None:
+    """Рассылает событие из очереди, пропуская снимок, не изменившийся с прошлой рассылки."""
+    options = self._options.get(item.event.value)
+
+    if not (options and options.fingerprint):
+      await self.notify(item.event, *item.args, **item.kwargs)
+      return
+
+    fingerprint = options.fingerprint(*item.args, **item.kwargs)
+    if self._fingerprints.get((item.event.value, item.key)) == fingerprint:
+      self.unchanged += 1
+      return
+
+    # Снимок считается разосланным, только если все подписчики справились,
+    # иначе тот же снимок в следующий раз разошлется снова (повтор неудачной правки, записи и т.п.)
+    self._fingerprints.pop((item.event.value, item.key), None)
+    if await self.notify(item.event, *item.args, **item.kwargs):
+      self._fingerprints[(item.event.value, item.key)] = fingerprint
+
+  async def _call_isolated(self, event: Event, callback: Callable, timeout: Optional[float], args: tuple, kwargs: dict) -> bool:
+    """Вызывает подписчика так, чтобы его ошибка или зависание не затронули остальных. False - ошибка или таймаут."""
+    try:
+      with self.metrics.measure(_subscriber_name(callback)):
+        await asyncio.wait_for(callback(*args, **kwargs), timeout)
+      return True
+    except asyncio.TimeoutError:
+      self._error_handler(f"Observer: {event.value}: {callback.__qualname__} не уложился в {timeout} с")
+    except Exception as err:
+      self._error_handler(f"Observer: {event.value}: ошибка в {callback.__qualname__}: {err}")
+    return False
 
 # !SECTION
 
 # SECTION NoServerRoute
 
 class NoServerRoute:
-  def __init__(self) -> None:
+  def __init__(self, metrics: Optional[Metrics] = None) -> None:
     self._routes: Dict[str, Callable] = {}
+    self.metrics: Metrics = metrics or Metrics()
 
   def create_route(self, route: str) -> Callable:
 
@@ -102,7 +410,8 @@ class NoServerRoute:
     if not route in self._routes:
       return None
     
-    return await self._routes[route](*argc, **kwargs)
+    with self.metrics.measure(f"route.{route}"):
+      return await self._routes[route](*argc, **kwargs)
 
 
 # !SECTION
@@ -1,6 +1,9 @@
-from observer.observer import Observer, Event, Param, NoServerRoute
+from observer.observer import Observer, Event, Param, NoServerRoute, Dispatch, Overflow
+from observer.metrics import Metrics
 from logger.log import Log
 
+import config
+
 class TextStyle:
   """ANSI Codes for Text Styles"""
   Default = "\x1b[0m"  # Сбрасывает все виды форматирования (включая цвет)
@@ -35,5 +38,41 @@ class Color:
 
 # -- Init Objects
 logger: Log = Log()
-observer: Observer = Observer()
-nsroute: NoServerRoute = NoServerRoute()
\ No newline at end of file
+metrics: Metrics = Metrics(render_ttl=config.METRICS_RENDER_TTL)
+observer: Observer = Observer(error_handler=logger.exception,
+                              queue_size=config.OBSERVER_QUEUE_SIZE,
+                              workers=config.OBSERVER_WORKERS,
+                              overflow=Overflow(config.OBSERVER_OVERFLOW),
+                              metrics=metrics)
+nsroute: NoServerRoute = NoServerRoute(metrics=metrics)
+
+# Подписчики WBH_INFO (статус в дискорде, кэш автодополнения)
+# независимы, поэтому медленный Discord API не должен задерживать остальных.
+# WBH_INFO - снимок статуса сервера: в очереди держим только последний на сервер,
+# а неизменившийся (та же карта и игроки, время в сообщении не в счет) повторно в дискорд не шлем.
+# Подписчики сообщают о неудаче исключением - тогда снимок разошлется снова
+observer.configure(Event.WBH_INFO, Dispatch.CONCURRENT, timeout=config.OBSERVER_SUBSCRIBER_TIMEOUT,
+                   overflow=Overflow.COALESCE, coalesce=True,
+                   coalesce_key=lambda data: data.get('server_id'),
+                   fingerprint=lambda data: hash(repr((data['map'], data['max_players'], data['current_players']))))
+
+# WBH_PLAYERS - тот же вебхук для LastPlayers в редис: время последнего появления
+# обновляется на каждый вебхук, поэтому без fingerprint
+observer.configure(Event.WBH_PLAYERS, overflow=Overflow.COALESCE, coalesce=True,
+                   coalesce_key=lambda data: data.get('server_id'))
+
+# Тик опроса статуса: если предыдущий еще в очереди, новый не нужен
+observer.configure(Event.BT_CS_Status, coalesce=True)
+
+# Сообщения чата терять нельзя: при переполнении вебхук подождет
+observer.configure(Event.WBH_MESSAGE, overflow=Overflow.BLOCK)
+
+# Фоновая очередь для /metrics: счетчики событий отдельно от текущего состояния (глубина и lag в сек)
+metrics.register_counter("dbot_observer_events_total", "События фоновой очереди Observer по исходу",
+                         lambda: {stat: value for stat, value in observer.queue_stats().items()
+                                  if stat in ("published", "processed", "dropped", "coalesced", "unchanged")},
+                         label="outcome")
+metrics.register_gauge("dbot_observer_queue", "Фоновая очередь событий Observer",
+                       lambda: {stat: value for stat, value in observer.queue_stats().items()
+                                if stat in ("depth", "lag_last", "lag_max")},
+                       label="stat")
@@ -1,10 +1,21 @@
 from io import BytesIO
-from typing import Optional
+from typing import Dict, List, Optional, Union
+import asyncio
 import socket
 
 startBytes = b'\xFF\xFF\xFF\xFF'
 endBytes = b'\n'
+splitBytes = b'\xFE\xFF\xFF\xFF'
 packetSize = 8192
+badChallenge = 'Bad challenge'
+
+# Пакет ответа короче этого размера считается последним (сервер шлет полные
+# пакеты по ~1400 байт, пока вывод не закончится)
+shortPacketSize = 1000
+# Сколько ждать следующий пакет длинного ответа, секунд
+quietWindow = 0.3
+# Ограничение на размер собранного ответа, байт
+maxResponseSize = 65536
 
 # SECTION Исключения RCON
 # -- RCONError
@@ -34,6 +45,87 @@ class NoConnection(RCONError):
 
 # !SECTION
 
+# SECTION Class ResponseAssembler
+class ResponseAssembler:
+  """
+  Собирает ответ GoldSrc из нескольких UDP-пакетов.
+
+  Длинный вывод (status, maps *, amx_banlist) сервер отправляет несколькими пакетами
+  "\\xFF\\xFF\\xFF\\xFFl...", а слишком большой пакет режет на части с заголовком
+  0xFFFFFFFE. Ответ считается полным, когда пришел короткий пакет или буфер
+  достиг max_size; окно тишины между пакетами отслеживает вызывающий код.
+  """
+
+  # -- __init__()
+  def __init__(self, max_size: int = maxResponseSize) -> None:
+    """
+    :param max_size: Максимальный размер собранного ответа в байтах.
+    """
+    self.max_size: int = max_size
+    self.complete: bool = False
+    self.truncated: bool = False
+    self._chunks: List[bytes] = []
+    self._size: int = 0
+    self._splits: Dict[int, Dict[int, bytes]] = {}
+
+  # -- feed()
+  def feed(self, packet: bytes) -> None:
+    """
+    Добавляет пришедший пакет.
+
+    :param packet: Сырой UDP-пакет.
+    """
+    if packet.startswith(splitBytes):
+      self._feed_split(packet)
+    elif packet.startswith(startBytes):
+      self._feed_payload(packet[len(startBytes):])
+
+  # -- _feed_split()
+  def _feed_split(self, packet: bytes) -> None:
+    """Складывает часть split-пакета: int32 id, байт (номер << 4 | всего частей), данные."""
+    if len(packet) < 9:
+      return
+
+    request_id = int.from_bytes(packet[4:8], 'little', signed=True)
+    total = packet[8] & 0x0F
+    index = packet[8] >> 4
+
+    parts = self._splits.setdefault(request_id, {})
+    parts[index] = packet[9:]
+
+    if total and all(i in parts for i in range(total)):
+      del self._splits[request_id]
+      joined = b''.join(parts[i] for i in range(total))
+      if joined.startswith(startBytes):
+        self._feed_payload(joined[len(startBytes):])
+
+  # -- _feed_payload()
+  def _feed_payload(self, payload: bytes) -> None:
+    """Добавляет тело пакета без стартовых байтов."""
+    is_short = len(payload) < shortPacketSize
+
+    if payload[:1] == b'l':
+      payload = payload[1:]
+    payload = payload.rstrip(b'\x00')
+
+    room = self.max_size - self._size
+    if len(payload) >= room:
+      payload = payload[:room]
+      self.truncated = True
+
+    self._chunks.append(payload)
+    self._size += len(payload)
+
+    if is_short or self.truncated:
+      self.complete = True
+
+  # -- text()
+  def text(self) -> str:
+    """Собранный ответ."""
+    return b''.join(self._chunks).decode(errors='replace').rstrip('\n')
+
+# !SECTION
+
 # SECTION Class RCON
 class RCON:
   # -- __init__()
@@ -49,6 +141,7 @@ class RCON:
     self.port: int = port
     self.password: str = password
     self.sock: Optional[socket.socket] = None
+    self.challenge: Optional[str] = None
 
   # -- connect()
   def connect(self, timeout: int = 6) -> None:
@@ -76,6 +169,7 @@ class RCON:
     if self.sock:
       self.sock.close()
       self.sock = None
+    self.challenge = None
 
   # -- getChallenge()
   def getChallenge(self) -> str:
@@ -102,34 +196,281 @@ class RCON:
       self.disconnect()
       raise ServerOffline(f"Ошибка в getChallenge (RCON) (Возможно, сервер оффлайн): {str(e)}")
 
+  # -- _send_rcon()
+  def _send_rcon(self, cmd: str) -> str:
+    """
+    Отправляет rcon пакет с закэшированным challenge.
+
+    :param cmd: Команда для выполнения.
+    :return: Ответ сервера.
+    """
+    msg = BytesIO()
+    msg.write(startBytes)
+    msg.write(b'rcon ')
+    msg.write(self.challenge.encode())
+    msg.write(b' ')
+    msg.write(self.password.encode())
+    msg.write(b' ')
+    msg.write(cmd.encode())
+    msg.write(endBytes)
+
+    self.sock.send(msg.getvalue())
+    return self._read_response()
+
+  # -- _read_response()
+  def _read_response(self) -> str:
+    """
+    Читает ответ, который может состоять из нескольких пакетов.
+
+    :return: Собранный ответ сервера.
+    """
+    assembler = ResponseAssembler()
+    assembler.feed(self.sock.recv(packetSize))
+
+    timeout = self.sock.gettimeout()
+    self.sock.settimeout(quietWindow)
+    try:
+      while not assembler.complete:
+        try:
+          assembler.feed(self.sock.recv(packetSize))
+        except socket.timeout:
+          break
+    finally:
+      self.sock.settimeout(timeout)
+
+    return assembler.text()
+
   # -- execute()
   def execute(self, cmd: str) -> str:
     """
     Выполнение команды на сервере.
 
+    Challenge запрашивается один раз на соединение и обновляется,
+    только когда сервер отвечает "Bad challenge".
+
     :param cmd: Команда для выполнения.
     :return: Результат выполнения команды.
     :raises ServerOffline: Если сервер оффлайн.
     """
     try:
-      challenge = self.getChallenge()
+      if self.challenge is None:
+        self.challenge = self.getChallenge()
 
-      msg = BytesIO()
-      msg.write(startBytes)
-      msg.write(b'rcon ')
-      msg.write(challenge.encode())
-      msg.write(b' ')
-      msg.write(self.password.encode())
-      msg.write(b' ')
-      msg.write(cmd.encode())
-      msg.write(endBytes)
+      response = self._send_rcon(cmd)
 
-      self.sock.send(msg.getvalue())
-      response = BytesIO(self.sock.recv(packetSize))
+      # Challenge устарел (рестарт сервера и т.п.) - обновляем и повторяем один раз
+      if response.startswith(badChallenge):
+        self.challenge = self.getChallenge()
+        response = self._send_rcon(cmd)
 
-      return response.getvalue()[5:-3].decode()
+      return response
     except Exception as e:
       self.disconnect()
       raise ServerOffline(f"Ошибка в execute (RCON) (Возможно, сервер оффлайн): {str(e)}")
 
 # !SECTION
+
+# SECTION Class AsyncRCON
+
+# -- _RCONProtocol
+class _RCONProtocol(asyncio.DatagramProtocol):
+  """Datagram-протокол: складывает пришедшие пакеты и ошибки в очередь соединения."""
+
+  def __init__(self) -> None:
+    self.transport: Optional[asyncio.DatagramTransport] = None
+    self.packets: asyncio.Queue = asyncio.Queue()
+
+  def connection_made(self, transport: asyncio.BaseTransport) -> None:
+    self.transport = transport
+
+  def datagram_received(self, data: bytes, addr) -> None:
+    self.packets.put_nowait(data)
+
+  def error_received(self, exc: Exception) -> None:
+    self.packets.put_nowait(exc)
+
+  def connection_lost(self, exc: Optional[Exception]) -> None:
+    self.transport = None
+    self.packets.put_nowait(exc or ConnectionResetError("Соединение закрыто"))
+
+class AsyncRCON:
+  # -- __init__()
+  def __init__(self, *, host: str, port: int = 27015, password: str, timeout: float = 6,
+               quiet_window: float = quietWindow, max_response_size: int = maxResponseSize) -> None:
+    """
+    Инициализация асинхронного клиента RCON.
+
+    В отличие от RCON не блокирует цикл событий: запросы отправляются через
+    asyncio datagram transport, а каждый пакет ответа ожидается с таймаутом.
+
+    :param host: Адрес хоста сервера.
+    :param port: Порт сервера (по умолчанию 27015).
+    :param password: Пароль для RCON.
+    :param timeout: Время ожидания ответа на один пакет в секундах.
+    :param quiet_window: Сколько ждать продолжения длинного ответа в секундах.
+    :param max_response_size: Максимальный размер собранного ответа в байтах.
+    """
+    self.host: str = host
+    self.port: int = port
+    self.password: str = password
+    self.timeout: float = timeout
+    self.quiet_window: float = quiet_window
+    self.max_response_size: int = max_response_size
+
+    self._transport: Optional[asyncio.DatagramTransport] = None
+    self._protocol: Optional[_RCONProtocol] = None
+    self._lock: asyncio.Lock = asyncio.Lock()
+    self._challenge: Optional[str] = None
+
+  # -- connected
+  @property
+  def connected(self) -> bool:
+    """Открыт ли UDP-транспорт."""
+    return self._transport is not None and not self._transport.is_closing()
+
+  # -- connect()
+  async def connect(self) -> None:
+    """
+    Подключение к RCON серверу.
+
+    :raises BadConnection: Если подключение не удалось.
+    :raises BadRCONPassword: Если неверный пароль RCON.
+    """
+    loop = asyncio.get_running_loop()
+
+    try:
+      self._transport, self._protocol = await loop.create_datagram_endpoint(
+        _RCONProtocol,
+        remote_addr=(self.host, int(self.port))
+      )
+      if await self.execute('stats') == 'Bad rcon_password.':
+        raise BadRCONPassword("Неверный пароль RCON.")
+    except Exception as e:
+      self.disconnect()
+      raise BadConnection(f"Ошибка при соединении с RCON: {str(e)}")
+
+  # -- disconnect()
+  def disconnect(self) -> None:
+    """Отключение от RCON сервера."""
+    if self._transport:
+      self._transport.close()
+    self._transport = None
+    self._protocol = None
+    self._challenge = None
+
+  # -- _send()
+  def _send(self, payload: bytes) -> None:
+    """
+    Отправляет пакет, предварительно выбрасывая опоздавшие ответы на прошлые запросы.
+
+    :param payload: Тело пакета без стартовых байтов.
+    :raises NoConnection: Если нет соединения.
+    """
+    if not self.connected:
+      raise NoConnection("Нет соединения с RCON.")
+
+    packets = self._protocol.packets
+    while not packets.empty():
+      packets.get_nowait()
+
+    self._transport.sendto(startBytes + payload + endBytes)
+
+  # -- _recv()
+  async def _recv(self, timeout: float) -> bytes:
+    """
+    Ждет следующий пакет.
+
+    :param timeout: Время ожидания в секундах.
+    :return: Сырой пакет.
+    :raises asyncio.TimeoutError: Если пакет не пришел за timeout.
+    """
+    if not self.connected:
+      raise NoConnection("Нет соединения с RCON.")
+
+    item: Union[bytes, Exception] = await asyncio.wait_for(self._protocol.packets.get(), timeout)
+    if isinstance(item, Exception):
+      raise item
+    return item
+
+  # -- _read_response()
+  async def _read_response(self) -> str:
+    """
+    Читает ответ, который может состоять из нескольких пакетов.
+
+    :return: Собранный ответ сервера.
+    """
+    assembler = ResponseAssembler(self.max_response_size)
+    assembler.feed(await self._recv(self.timeout))
+
+    while not assembler.complete:
+      try:
+        assembler.feed(await self._recv(self.quiet_window))
+      except asyncio.TimeoutError:
+        break
+
+    return assembler.text()
+
+  # -- get_challenge()
+  async def get_challenge(self) -> str:
+    """
+    Получение вызова (challenge) от сервера.
+
+    :return: Строка вызова.
+    :raises NoConnection: Если нет соединения.
+    :raises ServerOffline: Если сервер оффлайн.
+    """
+    if not self.connected:
+      raise NoConnection("Нет соединения с RCON.")
+
+    try:
+      self._send(b'getchallenge')
+      response = await self._recv(self.timeout)
+      # Ответ вида: "\xFF\xFF\xFF\xFFchallenge rcon <число>\n"
+      return response[4:].rstrip(b'\x00').decode(errors='ignore').split()[-1]
+    except Exception as e:
+      self.disconnect()
+      raise ServerOffline(f"Ошибка в get_challenge (AsyncRCON) (Возможно, сервер оффлайн): {str(e)}")
+
+  # -- _send_rcon()
+  async def _send_rcon(self, cmd: str) -> str:
+    """
+    Отправляет rcon пакет с закэшированным challenge.
+
+    :param cmd: Команда для выполнения.
+    :return: Ответ сервера.
+    """
+    self._send(b'rcon ' + self._challenge.encode() + b' ' + self.password.encode() + b' ' + cmd.encode())
+    return await self._read_response()
+
+  # -- execute()
+  async def execute(self, cmd: str) -> str:
+    """
+    Выполнение команды на сервере.
+
+    Запросы в рамках одного соединения выполняются строго по очереди,
+    так как GoldSrc не помечает ответы идентификатором запроса.
+    Challenge кэшируется на соединение и обновляется только по "Bad challenge".
+    Длинный ответ из нескольких пакетов собирается целиком.
+
+    :param cmd: Команда для выполнения.
+    :return: Результат выполнения команды.
+    :raises ServerOffline: Если сервер оффлайн.
+    """
+    async with self._lock:
+      try:
+        if self._challenge is None:
+          self._challenge = await self.get_challenge()
+
+        response = await self._send_rcon(cmd)
+
+        # Challenge устарел (рестарт сервера и т.п.) - обновляем и повторяем один раз
+        if response.startswith(badChallenge):
+          self._challenge = await self.get_challenge()
+          response = await self._send_rcon(cmd)
+
+        return response
+      except Exception as e:
+        self.disconnect()
+        raise ServerOffline(f"Ошибка в execute (AsyncRCON) (Возможно, сервер оффлайн): {str(e)}")
+
+# !SECTION
@@ -3,6 +3,7 @@ from enum import Enum
 from typing import Callable, List, Optional
 
 from observer.observer_client import observer, Event
+from observer.metrics import Metrics
 
 # SECTION Исключения WebServer
 
@@ -31,13 +32,14 @@ class AllowedIPsEmpty(WebServerError):
 # SECTION Class WebServer
 class WebServer:
   # -- __init__()
-  def __init__(self, host: str, port: int, allowed_ips: List[str]) -> None:
+  def __init__(self, host: str, port: int, allowed_ips: List[str], metrics: Optional[Metrics] = None) -> None:
     """
     Инициализирует экземпляр веб-сервера.
 
     :param host: Адрес, на котором будет запущен сервер.
     :param port: Порт, на котором будет запущен сервер.
     :param allowed_ips: Список разрешенных IP-адресов для доступа к серверу.
+    :param metrics: Куда писать время обработки запросов (None - не замерять).
     """
     if not allowed_ips:
       raise AllowedIPsEmpty("allowed_ips list cannot be empty.")
@@ -49,10 +51,15 @@ class WebServer:
     self.host: str = host
     self.port: int = port
     self.allowed_ips: List[str] = allowed_ips
+    self.metrics: Optional[Metrics] = metrics
 
     # Добавление middleware для проверки IP-адресов
     self.app.middlewares.append(self.ip_check_middleware)
 
+    # Замеряются только запросы с разрешенных IP
+    if metrics:
+      self.app.middlewares.append(self.timing_middleware)
+
   # -- ip_check_middleware()
   @web.middleware
   async def ip_check_middleware(self, request: web.Request, handler: Callable) -> web.Response:
@@ -77,6 +84,35 @@ class WebServer:
     # Если IP-адрес разрешен, продолжить обработку запроса
     return await handler(request)
 
+  # -- timing_middleware()
+  @web.middleware
+  async def timing_middleware(self, request: web.Request, handler: Callable) -> web.Response:
+    """
+    Middleware для замера времени обработки запросов.
+
+    Гистограмма называется "http.<метод> <маршрут>", для неизвестных путей - "http.<метод> unmatched",
+    чтобы сканеры не плодили метрики.
+
+    :param request: HTTP-запрос.
+    :param handler: Функция-обработчик для обработки запроса.
+    :return: Ответ обработчика.
+    """
+    route = request.match_info.route.resource
+    path = route.canonical if route else "unmatched"
+
+    with self.metrics.measure(f"http.{request.method} {path}"):
+      return await handler(request)
+
+  # -- add_get()
+  def add_get(self, path: str, handler: Callable) -> None:
+    """
+    Добавляет GET-маршрут в приложение.
+
+    :param path: Путь маршрута.
+    :param handler: Функция-обработчик для данного маршрута.
+    """
+    self.app.router.add_get(path, handler)
+
   # -- add_route()
   def add_post(self, path: str, handler: Callable, method: str = 'GET') -> None:
     """
@@ -1,5 +1,5 @@
 from enum import Enum
-from observer.observer_client import logger, observer, Event, nsroute, Color, TextStyle
+from observer.observer_client import logger, observer, metrics, Event, nsroute, Color, TextStyle
 from webserver.web_server import WebServer, WebServerError
 
 from aiohttp import web
@@ -10,7 +10,8 @@ import config
 # -- init
 ws: WebServer = WebServer(host=config.WEB_HOST_ADDRESS,
                           port=config.WEB_SERVER_PORT,
-                          allowed_ips=config.WEB_ALLOWED_IPS)
+                          allowed_ips=config.WEB_ALLOWED_IPS,
+                          metrics=metrics)
 
 # -- Events
 @observer.subscribe(Event.BE_READY)
@@ -94,6 +95,7 @@ async def handle_message(data: dict):
   team = data['team']
   channel_prefix = data.get('channel', '')
   steam_id = data.get('steam_id', '')
+  server_id = data.get('server_id')
 
   if not (cs_message and nick and team is not None ):
     return
@@ -108,7 +110,9 @@ async def handle_message(data: dict):
 
   formatted_message = format_message(nick, cs_message, team, prefix + channel_prefix)
 
-  await observer.notify(Event.WBH_MESSAGE, {
+  # Вебхук не ждет, пока дискорд примет сообщение
+  await observer.publish(Event.WBH_MESSAGE, {
+    "server_id": server_id,
     "message": formatted_message
   })
 
@@ -117,14 +121,23 @@ async def handle_info(data):
   map_name = data.get('map')
   current_players = data.get('current_players', [])
   max_players = data.get('max_players')
+  server_id = data.get('server_id')
 
   formatted_info = format_info_message(map_name, current_players, max_players)
 
-  await observer.notify(Event.WBH_INFO, {
+  await observer.publish(Event.WBH_INFO, {
+    "server_id": server_id,
+    "map": map_name,
+    "max_players": max_players,
     "info_message": formatted_info,
     "current_players": current_players
   })
 
+  await observer.publish(Event.WBH_PLAYERS, {
+    "server_id": server_id,
+    "current_players": current_players
+  })
+
 # !SECTION
 
 # SECTION class WebHooksType
@@ -152,9 +165,17 @@ async def handle_webhook(request: web.Request):
 
   return web.Response(text='OK')
 
+# -- handle_metrics
+async def handle_metrics(request: web.Request):
+  return web.Response(body=metrics.render_prometheus().encode(),
+                      headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
 # -- webhook route
 ws.add_post('/webhook', handle_webhook)
 
+# -- metrics route (доступ - только с WEB_ALLOWED_IPS)
+ws.add_get('/metrics', handle_metrics)
+
 @observer.subscribe(Event.WS_IP_NOT_ALLOWED)
 async def ev_ip_not_allowed(data):
   logger.info(f"IP NOT ADDLOWED: IP: \"{data['request_remote']}\", url:\"{data['request_url']}\", \"{data['request_method']}\", \"{data['request_headers']}\", \"{data['request_body']}\"")
\ No newline at end of file
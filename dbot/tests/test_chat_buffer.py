@@ -0,0 +1,77 @@
+import sys
+import os
+import unittest
+import asyncio
+
+# Добавляем путь к папке src в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from cs_server.chat_buffer import ChatBuffer, quote_arg, rcon_overhead  # type: ignore
+
+class TestChatBuffer(unittest.IsolatedAsyncioTestCase):
+  def test_pack(self):
+    """Порядок сохраняется, пачки не длиннее max_bytes, длинная команда уходит отдельно."""
+    buffer = ChatBuffer(None, max_bytes=8)
+    self.assertEqual(buffer.pack(["say a", "say b", "x" * 20, "say c", "d"]), ["say a", "say b", "x" * 20, "say c;d"])
+
+  def test_pack_bytes(self):
+    """Лимит считается в байтах, а не в символах."""
+    buffer = ChatBuffer(None, max_bytes=8)
+    self.assertEqual(buffer.pack(["ааа", "б"]), ["ааа", "б"])
+
+  def test_pack_overhead(self):
+    """Заголовок RCON-пакета вычитается из лимита."""
+    buffer = ChatBuffer(None, max_bytes=20, overhead=12)
+    self.assertEqual(buffer.pack(["say a", "say b"]), ["say a", "say b"])
+
+    overhead = rcon_overhead("secret")
+    packet = b"\xFF\xFF\xFF\xFFrcon -2147483648 secret "
+    self.assertEqual(overhead, len(packet))
+
+  def test_quote_arg(self):
+    """Текст пользователя не может закрыть аргумент или склеенную команду."""
+    buffer = ChatBuffer(None, max_bytes=1000)
+    command = "ultrahc_ds_send_msg " + quote_arg("nick") + " " + quote_arg('hi"; quit; say "x')
+    self.assertEqual(command, "ultrahc_ds_send_msg \"nick\" \"hi', quit, say 'x\"")
+    self.assertEqual(buffer.pack([command, "say b"]), [command + ";say b"])
+
+  async def test_message_during_flush(self):
+    """Команда, пришедшая во время отправки, уходит без следующего add()."""
+    sent = []
+    sending = asyncio.Event()
+    release = asyncio.Event()
+
+    async def send(command):
+      sent.append(command)
+      sending.set()
+      await release.wait()
+
+    buffer = ChatBuffer(send, window=0.01)
+    buffer.add("say a")
+    await asyncio.wait_for(sending.wait(), 1)
+    buffer.add("say b")
+    release.set()
+    await asyncio.sleep(0.1)
+
+    self.assertEqual(sent, ["say a", "say b"])
+
+  async def test_send_error(self):
+    """Ошибка отправки одной пачки не теряет остальные и передается в error_handler."""
+    sent = []
+    errors = []
+
+    async def send(command):
+      if command == "x" * 20:
+        raise RuntimeError("boom")
+      sent.append(command)
+
+    buffer = ChatBuffer(send, window=0.01, max_bytes=8, error_handler=errors.append)
+    for command in ("say a", "x" * 20, "say c"):
+      buffer.add(command)
+    await asyncio.sleep(0.1)
+
+    self.assertEqual(sent, ["say a", "say c"])
+    self.assertEqual(len(errors), 1)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,56 @@
+import sys
+import os
+import unittest
+import asyncio
+
+# Добавляем путь к папке src в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from bot.chat_relay import ChatRelay  # type: ignore
+
+class TestChatRelay(unittest.IsolatedAsyncioTestCase):
+  async def test_flush_interval(self):
+    """Первая строка уходит сразу, остальные склеиваются до конца интервала."""
+    flushed = []
+
+    async def flush(lines):
+      flushed.append(lines)
+
+    relay = ChatRelay(flush, interval=0.05)
+    relay.add("a\n")
+    await asyncio.sleep(0.01)
+    for line in ("b\n", "c\n", "d\n"):
+      relay.add(line)
+    await asyncio.sleep(0.1)
+
+    self.assertEqual(flushed, [["a\n"], ["b\n", "c\n", "d\n"]])
+    stats = relay.stats()
+    self.assertEqual((stats["flushes"], stats["merged_max"], stats["merged_avg"]), (2, 3, 2.0))
+
+  def test_pack(self):
+    """Куски не длиннее лимита, порядок сохраняется, длинная строка делится на куски."""
+    self.assertEqual(ChatRelay.pack(["aaa\n", "bb\n", "c\n", "x" * 20, "d\n"], 8),
+                     ["aaa\nbb\n", "c\n", "x" * 8, "x" * 8, "x" * 4 + "d\n"])
+
+  async def test_flush_error(self):
+    """Ошибка публикации пишется в лог и не теряет следующие строки."""
+    flushed = []
+    errors = []
+
+    async def flush(lines):
+      await asyncio.sleep(0.01)
+      if lines == ["a\n"]:
+        raise RuntimeError("discord")
+      flushed.append(lines)
+
+    relay = ChatRelay(flush, interval=0.02, error_handler=errors.append)
+    relay.add("a\n")
+    await asyncio.sleep(0)
+    relay.add("b\n")    # приходит во время неудачной публикации
+    await asyncio.sleep(0.1)
+
+    self.assertEqual(flushed, [["b\n"]])
+    self.assertEqual(len(errors), 1)
+
+if __name__ == '__main__':
+  unittest.main()
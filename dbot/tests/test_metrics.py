@@ -0,0 +1,76 @@
+import sys
+import os
+import unittest
+import asyncio
+
+# Добавляем путь к папке src в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from observer.metrics import Histogram, Metrics  # type: ignore
+from observer.observer import Observer, NoServerRoute, Event, Dispatch  # type: ignore
+
+class TestHistogram(unittest.TestCase):
+  def test_percentiles(self):
+    """Перцентили попадают в свою корзину и не превышают максимум."""
+    histogram = Histogram()
+    for _ in range(90):
+      histogram.observe(0.0015)   # корзина (1 мс, 2 мс]
+    for _ in range(10):
+      histogram.observe(0.1, error=True)
+
+    summary = histogram.summary()
+    self.assertEqual((summary["count"], summary["errors"]), (100, 10))
+    self.assertTrue(0.001 < summary["p50"] <= 0.002)
+    self.assertTrue(0.064 < summary["p99"] <= 0.1)
+    self.assertEqual(Histogram().percentile(0.5), 0.0)
+
+class TestPrometheus(unittest.TestCase):
+  def test_render(self):
+    """Выгрузка содержит гистограммы, ошибки и датчики и кэшируется на render_ttl."""
+    metrics = Metrics(render_ttl=60)
+    metrics.observe("route./ping", 0.003)
+    metrics.observe("route./ping", 0.5, error=True)
+    metrics.register_gauge("dbot_pool", "Пул", lambda: {"in_use": 2, "free": 3}, label="state")
+    metrics.register_gauge("dbot_offline", "Недоступен", lambda: None)
+    metrics.register_counter("dbot_timeouts_total", "Таймауты", lambda: {"main": 4}, label="server")
+
+    text = metrics.render_prometheus()
+    self.assertIn('dbot_latency_seconds_bucket{name="route./ping",le="0.004"} 1', text)
+    self.assertIn('dbot_latency_seconds_bucket{name="route./ping",le="+Inf"} 2', text)
+    self.assertIn('dbot_latency_seconds_errors_total{name="route./ping"} 1', text)
+    self.assertIn('dbot_pool{state="in_use"} 2', text)
+    self.assertIn('# TYPE dbot_pool gauge', text)
+    self.assertIn('# TYPE dbot_timeouts_total counter\ndbot_timeouts_total{server="main"} 4', text)
+    self.assertNotIn("dbot_offline", text)
+
+    metrics.observe("route./ping", 0.003)
+    self.assertIs(metrics.render_prometheus(), text)
+
+class TestMetricsHooks(unittest.IsolatedAsyncioTestCase):
+  async def test_observer_and_route(self):
+    """Observer и NoServerRoute пишут время событий, подписчиков и маршрутов, ошибки считаются."""
+    metrics = Metrics()
+    observer = Observer(error_handler=lambda message: None, metrics=metrics)
+    nsroute = NoServerRoute(metrics=metrics)
+    observer.configure(Event.WBH_INFO, Dispatch.CONCURRENT)
+
+    @observer.subscribe(Event.WBH_INFO)
+    async def broken(data):
+      raise ValueError("boom")
+
+    @nsroute.create_route("/ping")
+    async def ping():
+      await asyncio.sleep(0.01)
+      return "pong"
+
+    await observer.notify(Event.WBH_INFO, {})
+    self.assertEqual(await nsroute.call_route("/ping"), "pong")
+
+    snapshot = metrics.snapshot()
+    self.assertEqual(snapshot["event.wbh_info"]["count"], 1)
+    self.assertEqual(snapshot[f"subscriber.{__name__}.{broken.__qualname__}"]["errors"], 1)
+    self.assertGreaterEqual(snapshot["route./ping"]["p50"], 0.005)
+    self.assertIn("route./ping", metrics.report())
+
+if __name__ == '__main__':
+  unittest.main()
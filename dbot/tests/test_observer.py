@@ -0,0 +1,201 @@
+import sys
+import os
+import unittest
+import asyncio
+
+# Добавляем путь к папке src в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from observer.observer import Observer, Event, Dispatch, Overflow  # type: ignore
+
+class TestObserver(unittest.IsolatedAsyncioTestCase):
+  def setUp(self):
+    self.errors = []
+    self.observer = Observer(error_handler=self.errors.append)
+
+  async def test_sequential_order(self):
+    """По умолчанию подписчики вызываются по очереди."""
+    calls = []
+
+    @self.observer.subscribe(Event.WBH_MESSAGE)
+    async def first(data):
+      await asyncio.sleep(0.01)
+      calls.append(("first", data))
+
+    @self.observer.subscribe(Event.WBH_MESSAGE)
+    async def second(data):
+      calls.append(("second", data))
+
+    await self.observer.notify(Event.WBH_MESSAGE, 1)
+    self.assertEqual(calls, [("first", 1), ("second", 1)])
+
+  async def test_concurrent_isolation(self):
+    """В режиме CONCURRENT зависший или упавший подписчик не мешает остальным."""
+    calls = []
+    self.observer.configure(Event.WBH_INFO, Dispatch.CONCURRENT, timeout=0.05)
+
+    @self.observer.subscribe(Event.WBH_INFO)
+    async def slow(data):
+      await asyncio.sleep(1)
+      calls.append("slow")
+
+    @self.observer.subscribe(Event.WBH_INFO)
+    async def broken(data):
+      raise ValueError("boom")
+
+    @self.observer.subscribe(Event.WBH_INFO)
+    async def fast(data):
+      calls.append("fast")
+
+    await self.observer.notify(Event.WBH_INFO, {})
+    self.assertEqual(calls, ["fast"])
+    self.assertEqual(len(self.errors), 2)
+
+  async def test_publish_keeps_order(self):
+    """publish() не ждет подписчиков, но события одного типа обрабатываются по порядку."""
+    observer = Observer(error_handler=self.errors.append, workers=4)
+    calls = []
+
+    @observer.subscribe(Event.WBH_MESSAGE)
+    async def relay(data):
+      await asyncio.sleep(0.01 if data % 2 else 0)
+      calls.append(data)
+
+    for i in range(6):
+      await observer.publish(Event.WBH_MESSAGE, i)
+    self.assertEqual(calls, [])
+
+    await observer._queue.join()
+    self.assertEqual(calls, list(range(6)))
+    self.assertEqual(observer.queue_stats()["processed"], 6)
+
+  async def test_publish_other_types_not_stalled(self):
+    """Поток событий одного типа не занимает всех обработчиков: другие типы идут параллельно."""
+    observer = Observer(error_handler=self.errors.append, workers=2)
+    gate = asyncio.Event()
+    calls = []
+
+    @observer.subscribe(Event.WBH_MESSAGE)
+    async def relay(data):
+      await gate.wait()
+      calls.append(data)
+
+    @observer.subscribe(Event.WBH_INFO)
+    async def info(data):
+      calls.append(data)
+
+    for i in range(5):
+      await observer.publish(Event.WBH_MESSAGE, i)
+    await observer.publish(Event.WBH_INFO, "info")
+    await asyncio.sleep(0.05)
+    self.assertEqual(calls, ["info"])
+
+    gate.set()
+    await observer._queue.join()
+    self.assertEqual(calls, ["info", 0, 1, 2, 3, 4])
+
+  async def test_publish_block(self):
+    """BLOCK ждет места в очереди, события не теряются."""
+    observer = Observer(error_handler=self.errors.append, queue_size=2, overflow=Overflow.BLOCK)
+    calls = []
+
+    @observer.subscribe(Event.WBH_MESSAGE)
+    async def relay(data):
+      await asyncio.sleep(0)
+      calls.append(data)
+
+    for i in range(10):
+      await observer.publish(Event.WBH_MESSAGE, i)
+    await observer._queue.join()
+
+    self.assertEqual(calls, list(range(10)))
+    self.assertEqual(observer.queue_stats()["dropped"], 0)
+
+  async def test_publish_overflow(self):
+    """При переполнении DROP_OLDEST выкидывает старое событие, COALESCE обновляет ожидающее."""
+    observer = Observer(error_handler=self.errors.append, queue_size=2)
+    observer.configure(Event.WBH_INFO, overflow=Overflow.COALESCE)
+    calls = []
+
+    @observer.subscribe(Event.WBH_MESSAGE)
+    @observer.subscribe(Event.WBH_INFO)
+    async def record(data):
+      calls.append(data)
+
+    await observer.publish(Event.WBH_INFO, "info-1")
+    await observer.publish(Event.WBH_MESSAGE, "msg-1")
+    await observer.publish(Event.WBH_INFO, "info-2")      # заменяет info-1
+    await observer.publish(Event.WBH_MESSAGE, "msg-2")    # выкидывает info-2 (самое старое)
+
+    await observer._queue.join()
+    self.assertEqual(calls, ["msg-1", "msg-2"])
+    stats = observer.queue_stats()
+    self.assertEqual((stats["coalesced"], stats["dropped"]), (1, 1))
+
+  async def test_drop_oldest_keeps_block(self):
+    """DROP_OLDEST не выкидывает события с политикой BLOCK; если есть только они, теряется новое событие."""
+    observer = Observer(error_handler=self.errors.append, queue_size=2)
+    observer.configure(Event.WBH_MESSAGE, overflow=Overflow.BLOCK)
+    calls = []
+
+    @observer.subscribe(Event.WBH_MESSAGE)
+    @observer.subscribe(Event.WBH_INFO)
+    async def record(data):
+      calls.append(data)
+
+    await observer.publish(Event.WBH_MESSAGE, "msg-1")
+    await observer.publish(Event.WBH_INFO, "info-1")
+    await observer.publish(Event.WBH_INFO, "info-2")      # выкидывает info-1, а не msg-1
+    await observer.publish(Event.WBH_MESSAGE, "msg-2")    # ждет места
+    await observer.publish(Event.WBH_MESSAGE, "msg-3")    # ждет места
+    await observer.publish(Event.WBH_INFO, "info-3")      # в очереди только BLOCK - теряется само
+
+    await observer._queue.join()
+    self.assertEqual(calls, ["msg-1", "info-2", "msg-2", "msg-3"])
+    self.assertEqual(observer.queue_stats()["dropped"], 2)
+
+  async def test_coalesce_snapshots(self):
+    """Снимок состояния: в очереди остается последний на ключ, неизменившийся не рассылается."""
+    observer = Observer(error_handler=self.errors.append)
+    observer.configure(Event.WBH_INFO, coalesce=True,
+                       coalesce_key=lambda data: data["server_id"],
+                       fingerprint=lambda data: data["map"])
+    calls = []
+
+    @observer.subscribe(Event.WBH_INFO)
+    async def record(data):
+      calls.append((data["server_id"], data["map"]))
+
+    await observer.publish(Event.WBH_INFO, {"server_id": "a", "map": "de_dust2"})
+    await observer.publish(Event.WBH_INFO, {"server_id": "b", "map": "de_inferno"})
+    await observer.publish(Event.WBH_INFO, {"server_id": "a", "map": "de_nuke"})   # заменяет de_dust2
+    await observer._queue.join()
+
+    await observer.publish(Event.WBH_INFO, {"server_id": "a", "map": "de_nuke"})   # без изменений
+    await observer._queue.join()
+
+    self.assertEqual(calls, [("a", "de_nuke"), ("b", "de_inferno")])
+    stats = observer.queue_stats()
+    self.assertEqual((stats["coalesced"], stats["unchanged"]), (1, 1))
+
+  async def test_snapshot_retry_after_failure(self):
+    """Снимок, на котором подписчик упал, не запоминается и при повторе рассылается снова."""
+    observer = Observer(error_handler=self.errors.append)
+    observer.configure(Event.WBH_INFO, Dispatch.CONCURRENT, fingerprint=lambda data: data)
+    calls = []
+
+    @observer.subscribe(Event.WBH_INFO)
+    async def flaky(data):
+      calls.append(data)
+      if len(calls) == 1:
+        raise ValueError("boom")
+
+    for _ in range(3):
+      await observer.publish(Event.WBH_INFO, "de_dust2")
+      await observer._queue.join()
+
+    self.assertEqual(calls, ["de_dust2", "de_dust2"])
+    self.assertEqual(observer.queue_stats()["unchanged"], 1)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -2,11 +2,56 @@ import sys
 import os
 import unittest
 import asyncio
+import socket
 
 # Добавляем путь к папке src в sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 
-from rehlds.rcon import RCON  # type: ignore # Импортируем класс RCON
+from rehlds.rcon import RCON, AsyncRCON, BadConnection  # type: ignore # Импортируем класс RCON
+from cs_server.csrcon import CSRCON, CommandExecutionError  # type: ignore
+
+class FakeGoldSrcServer(asyncio.DatagramProtocol):
+  """Минимальный UDP-сервер, отвечающий как HLDS на getchallenge и rcon."""
+  def __init__(self):
+    self.transport = None
+    self.received = []
+    self.challenge = b'123456'
+
+  def connection_made(self, transport):
+    self.transport = transport
+
+  def datagram_received(self, data, addr):
+    self.received.append(data)
+    if data[4:].startswith(b'getchallenge'):
+      self.transport.sendto(b'\xFF\xFF\xFF\xFFchallenge rcon ' + self.challenge + b'\n\x00', addr)
+      return
+
+    # rcon <challenge> <password> <cmd>
+    _, challenge, _, cmd = data[4:].rstrip(b'\n').split(b' ', 3)
+    if challenge != self.challenge:
+      self.transport.sendto(b'\xFF\xFF\xFF\xFFlBad challenge.\n\x00\x00', addr)
+      return
+
+    if cmd == b'hang':
+      # Команда без ответа
+      return
+
+    if cmd == b'status':
+      # Длинный вывод: несколько полных пакетов и короткий последний
+      for line in (b'a' * 1200, b'b' * 1200, b'end'):
+        self.transport.sendto(b'\xFF\xFF\xFF\xFFl' + line + b'\x00', addr)
+      return
+
+    if cmd == b'maps *':
+      # Один большой пакет, порезанный на части с заголовком 0xFFFFFFFE (приходят не по порядку)
+      packet = b'\xFF\xFF\xFF\xFFl' + b'm' * 2500 + b'\n\x00'
+      parts = [packet[:1200], packet[1200:2400], packet[2400:]]
+      for index in (1, 0, 2):
+        header = b'\xFE\xFF\xFF\xFF' + (7).to_bytes(4, 'little') + bytes([(index << 4) | len(parts)])
+        self.transport.sendto(header + parts[index], addr)
+      return
+
+    self.transport.sendto(b'\xFF\xFF\xFF\xFFl' + b'echo ' + cmd + b'\n\x00\x00', addr)
 
 class TestRCON(unittest.IsolatedAsyncioTestCase):
   async def asyncSetUp(self):
@@ -27,5 +72,79 @@ class TestRCON(unittest.IsolatedAsyncioTestCase):
     """Очистка после каждого теста."""
     self.rcon.disconnect()
 
+class TestAsyncRCON(unittest.IsolatedAsyncioTestCase):
+  async def asyncSetUp(self):
+    """Поднимает локальный фейковый сервер."""
+    loop = asyncio.get_running_loop()
+    self.server_transport, self.server = await loop.create_datagram_endpoint(FakeGoldSrcServer, local_addr=('127.0.0.1', 0))
+    port = self.server_transport.get_extra_info('sockname')[1]
+    self.rcon = AsyncRCON(host='127.0.0.1', port=port, password='12345', timeout=1, quiet_window=0.2)
+
+  async def test_execute(self):
+    """Команды выполняются и не перемешивают ответы при параллельном вызове."""
+    await self.rcon.connect()
+    responses = await asyncio.gather(self.rcon.execute('stats'), self.rcon.execute('meta list'))
+    self.assertEqual(responses, ['echo stats', 'echo meta list'])
+
+  async def test_multipacket_response(self):
+    """Ответ из нескольких пакетов собирается целиком."""
+    await self.rcon.connect()
+    self.assertEqual(await self.rcon.execute('status'), 'a' * 1200 + 'b' * 1200 + 'end')
+
+  async def test_split_response(self):
+    """Split-пакеты 0xFFFFFFFE собираются по номеру части."""
+    await self.rcon.connect()
+    self.assertEqual(await self.rcon.execute('maps *'), 'm' * 2500)
+
+  async def test_challenge_cached(self):
+    """getchallenge запрашивается один раз и повторно только после "Bad challenge"."""
+    await self.rcon.connect()
+    await self.rcon.execute('stats')
+    await self.rcon.execute('stats')
+    self.assertEqual(sum(1 for packet in self.server.received if b'getchallenge' in packet), 1)
+
+    self.server.challenge = b'654321'
+    self.assertEqual(await self.rcon.execute('stats'), 'echo stats')
+    self.assertEqual(sum(1 for packet in self.server.received if b'getchallenge' in packet), 2)
+
+  async def test_connect_timeout(self):
+    """Молчащий сервер не блокирует цикл событий, а дает BadConnection по таймауту."""
+    self.server_transport.close()
+    silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    silent.bind(('127.0.0.1', 0))
+    self.addCleanup(silent.close)
+
+    rcon = AsyncRCON(host='127.0.0.1', port=silent.getsockname()[1], password='12345', timeout=0.2)
+    with self.assertRaises(BadConnection):
+      await rcon.connect()
+
+  async def asyncTearDown(self):
+    self.rcon.disconnect()
+    self.server_transport.close()
+
+class TestAsyncCSRCON(unittest.IsolatedAsyncioTestCase):
+  async def asyncSetUp(self):
+    loop = asyncio.get_running_loop()
+    self.server_transport, self.server = await loop.create_datagram_endpoint(FakeGoldSrcServer, local_addr=('127.0.0.1', 0))
+    port = self.server_transport.get_extra_info('sockname')[1]
+    self.cs = CSRCON(host='127.0.0.1', password='12345', max_in_flight=2, port=port)
+    await self.cs.connect_to_server()
+
+  async def test_exec(self):
+    self.assertEqual(await self.cs.exec('stats'), 'echo stats')
+
+  async def test_disconnect_fails_running_command(self):
+    """Команда, которую обработчик выполняет в момент disconnect(), завершается ошибкой, а не висит."""
+    running = asyncio.create_task(self.cs.exec('hang'))
+    await asyncio.sleep(0.1)
+    await self.cs.disconnect()
+
+    with self.assertRaises(CommandExecutionError):
+      await asyncio.wait_for(running, 1)
+
+  async def asyncTearDown(self):
+    await self.cs.disconnect()
+    self.server_transport.close()
+
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,45 @@
+import sys
+import os
+import unittest
+
+# Добавляем путь к папке src в sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from bot.search_index import SearchIndex  # type: ignore
+
+class TestSearchIndex(unittest.TestCase):
+  def setUp(self):
+    self.index = SearchIndex(max_entries=4)
+    self.index.update({"Asura": 1, "asuna": 2, "Player": 3, "de_dust2": 0})
+
+  def test_search(self):
+    """Поиск подстроки без учета регистра, свежие (больший счет) первыми."""
+    self.assertEqual(self.index.search("asu"), ["asuna", "Asura"])
+    self.assertEqual(self.index.search("SURA"), ["Asura"])
+    self.assertEqual(self.index.search("dust"), ["de_dust2"])
+    self.assertEqual(self.index.search("layr"), [])
+    self.assertEqual(self.index.search("", limit=2), ["Player", "asuna"])
+    self.assertEqual(self.index.search("a", exclude={"asuna"}), ["Asura", "Player"])
+
+  def test_ranking(self):
+    """Начало имени -> начало слова -> подстрока -> опечатки; внутри группы свежие выше."""
+    index = SearchIndex()
+    index.update({"de_dust2_2x2": 1, "de_dust2": 0, "[CLAN] Dusty": 5, "Stardust": 9, "Ｄｕｓｔｅｒ": 2})
+
+    self.assertEqual(index.search("dust"), ["Ｄｕｓｔｅｒ", "[CLAN] Dusty", "de_dust2_2x2", "de_dust2", "Stardust"])
+    self.assertEqual(index.search("de_dsut"), ["de_dust2_2x2", "de_dust2"])
+    self.assertEqual(index.search("dsuty")[0], "[CLAN] Dusty")
+    self.assertEqual(index.search("zzzz"), [])
+
+  def test_limits(self):
+    """Лишние имена с меньшим счетом вытесняются, удаленные не находятся."""
+    self.index.update({"Newbie": 5})
+    self.assertNotIn("de_dust2", self.index)
+
+    self.index.remove("Asura")
+    self.index.prune(min_score=3)
+    self.assertEqual(self.index.search(""), ["Newbie", "Player"])
+    self.assertEqual(self.index.search("asu"), [])
+
+if __name__ == '__main__':
+  unittest.main()